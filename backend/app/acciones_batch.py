@@ -0,0 +1,81 @@
+"""Batched loading of acciones for a set of tareas.
+
+Loads the acciones of many tareas with a single ``tarea_id = ANY(:tarea_ids)``
+query instead of one query (or HTTP request) per tarea, and builds the single
+query of a tarea with all its acciones (``GET /tareas/{tarea_id}/completa``).
+"""
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import Integer, bindparam, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import any_id, model_to_dict
+from app.models import AccionRealizada
+
+# Upper bound on tarea_ids per batch request; keeps the array parameter and
+# the response size bounded.
+MAX_BATCH_TAREA_IDS = 5000
+
+# Tarea plus its acciones (newest first) as one JSON document. Cast to text so
+# the driver hands it over as a string that is returned without re-encoding.
+_TAREA_COMPLETA_SQL = text("""
+    SELECT json_build_object(
+        'tarea', row_to_json(t),
+        'acciones_realizadas', COALESCE(
+            (SELECT json_agg(a ORDER BY a.fecha_accion DESC NULLS LAST, a.id DESC)
+             FROM acciones_realizadas a
+             WHERE a.tarea_id = t.tarea_id),
+            '[]'::json
+        )
+    )::text
+    FROM tareas t
+    WHERE t.tarea_id = :tarea_id
+""").bindparams(bindparam("tarea_id", type_=Integer))
+
+
+def tarea_completa_query(tarea_id: int):
+    """SELECT of a tarea and its acciones as one JSON text value (NULL row if it does not exist)."""
+    return _TAREA_COMPLETA_SQL.bindparams(tarea_id=tarea_id)
+
+
+def acciones_by_tarea_query(
+    tarea_ids: list[int],
+    estados: list[str] | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+):
+    """SELECT of the acciones of ``tarea_ids`` (see ``load_acciones_by_tarea``)."""
+    query = select(AccionRealizada).where(any_id(AccionRealizada.tarea_id, tarea_ids, "tarea_ids"))
+    if estados:
+        query = query.where(func.lower(AccionRealizada.estado).in_([e.lower() for e in estados]))
+    if fecha_desde is not None:
+        query = query.where(AccionRealizada.fecha_accion >= fecha_desde)
+    if fecha_hasta is not None:
+        query = query.where(AccionRealizada.fecha_accion <= fecha_hasta)
+    return query.order_by(AccionRealizada.tarea_id, AccionRealizada.fecha_accion, AccionRealizada.id)
+
+
+async def load_acciones_by_tarea(
+    db: AsyncSession,
+    tarea_ids: list[int],
+    estados: list[str] | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+) -> dict[int, list[dict]]:
+    """Return ``{tarea_id: [accion, ...]}`` for ``tarea_ids``.
+
+    ``estados`` is matched case-insensitively; ``fecha_desde``/``fecha_hasta``
+    bound fecha_accion (inclusive). Every requested id is present in the
+    result (with an empty list when nothing matches). Acciones are ordered by
+    fecha_accion, then id.
+    """
+    tarea_ids = list(dict.fromkeys(tarea_ids))
+    if not tarea_ids:
+        return {}
+
+    query = acciones_by_tarea_query(tarea_ids, estados, fecha_desde, fecha_hasta)
+    grouped: dict[int, list[dict]] = defaultdict(list)
+    for accion in (await db.scalars(query)).all():
+        grouped[accion.tarea_id].append(model_to_dict(accion))
+    return {tarea_id: grouped.get(tarea_id, []) for tarea_id in tarea_ids}
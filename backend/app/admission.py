@@ -0,0 +1,94 @@
+"""
+Admission control for expensive endpoints.
+
+Heavy routes declare a route class with ``Depends(admission("export"))``.
+Each class has a concurrency limit, a bounded queue and a queue timeout
+(``ADMISSION_LIMITS`` in settings), enforced per worker process:
+
+- a free slot: the request runs at once,
+- all slots busy and room in the queue: it waits up to ``timeout`` seconds,
+- queue full: immediate 429,
+- still waiting after ``timeout``: 503,
+
+both with ``Retry-After``. The dependency runs after ``verify_auth`` and
+keeps the slot until the response is finished, streamed bodies (export,
+agent SSE) included, so cheap reads never queue behind heavy work (the exit
+code of a ``yield`` dependency runs after the response from FastAPI 0.118,
+hence the minimum version in pyproject.toml). Classes missing from
+``ADMISSION_LIMITS`` are not limited.
+"""
+import asyncio
+import logging
+import math
+
+from fastapi import HTTPException
+
+from app import metrics
+from app.config import AdmissionLimit, settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded wait queue for one route class."""
+
+    def __init__(self, name: str, limit: AdmissionLimit):
+        self.name = name
+        self.limit = limit
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit.concurrency)
+        self._retry_after = str(max(1, math.ceil(limit.timeout)))
+
+    def _reject(self, status_code: int, reason: str, detail: str) -> HTTPException:
+        metrics.ADMISSION_REJECTED.labels(self.name, reason).inc()
+        logger.warning(f"Admission '{self.name}' rejected a request: {reason}")
+        return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": self._retry_after})
+
+    async def acquire(self) -> None:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self.waiting >= self.limit.queue:
+            raise self._reject(429, "queue_full", f"Too many concurrent '{self.name}' requests, retry later")
+        self.waiting += 1
+        metrics.ADMISSION_QUEUED.labels(self.name).inc()
+        try:
+            async with asyncio.timeout(self.limit.timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            raise self._reject(503, "queue_timeout", f"Server busy with '{self.name}' requests, retry later")
+        finally:
+            self.waiting -= 1
+            metrics.ADMISSION_QUEUED.labels(self.name).dec()
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+_limiters: dict[str, AdmissionLimiter] = {}
+
+
+def _limiter(route_class: str) -> AdmissionLimiter | None:
+    limiter = _limiters.get(route_class)
+    if limiter is None and route_class in settings.ADMISSION_LIMITS:
+        limiter = _limiters[route_class] = AdmissionLimiter(route_class, settings.ADMISSION_LIMITS[route_class])
+    return limiter
+
+
+def admission(route_class: str):
+    """Dependency that admits the request under the limits of ``route_class``."""
+
+    async def admit():
+        limiter = _limiter(route_class)
+        if limiter is None:
+            yield
+            return
+        await limiter.acquire()
+        metrics.ADMISSION_IN_USE.labels(route_class).inc()
+        try:
+            yield
+        finally:
+            metrics.ADMISSION_IN_USE.labels(route_class).dec()
+            limiter.release()
+
+    return admit
@@ -4,6 +4,7 @@ import logging
 import httpx
 from .config import AGENT_API_BASE_URL
 from ..config import settings as app_settings
+from ..database import READ_PRIMARY_HEADER
 
 LOG = logging.getLogger("task_manager_agent")
 
@@ -19,13 +20,28 @@ class APIError(Exception):
 class AgentAPIClient:
     """Async HTTP client for the Task Manager API."""
 
-    def __init__(self, base_url: str = None):
+    def __init__(self, base_url: str = None, read_primary_until: str | None = None):
         self.base_url = (base_url or AGENT_API_BASE_URL).rstrip("/")
+        # Echoed on every request so reads after a write skip lagging replicas
+        self.read_primary_until = read_primary_until
         headers = {}
         if app_settings.API_KEY:
             headers["X-API-Key"] = app_settings.API_KEY
         LOG.info("Agent API client targeting: %s (API_KEY configured: %s)", self.base_url, bool(app_settings.API_KEY))
-        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=30.0, headers=headers)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=30.0,
+            headers=headers,
+            event_hooks={"request": [self._send_read_primary], "response": [self._keep_read_primary]},
+        )
+
+    async def _send_read_primary(self, request: httpx.Request):
+        if self.read_primary_until:
+            request.headers[READ_PRIMARY_HEADER] = self.read_primary_until
+
+    async def _keep_read_primary(self, response: httpx.Response):
+        if READ_PRIMARY_HEADER in response.headers:
+            self.read_primary_until = response.headers[READ_PRIMARY_HEADER]
 
     async def search(self, table: str, body: dict) -> dict:
         """POST /{table}/search with flexible filters."""
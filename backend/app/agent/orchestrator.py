@@ -12,11 +12,14 @@ from .tools_definition import AGENT_TOOLS
 from .tools_executor import execute_tool
 from .system_prompt import get_system_prompt
 from . import config
+from .. import metrics
 
 logger = logging.getLogger("task_manager_agent")
 
 
-async def stream_agent_response(messages: list[dict], user_email: str | None = None) -> AsyncGenerator[str, None]:
+async def stream_agent_response(
+    messages: list[dict], user_email: str | None = None, read_primary_until: str | None = None
+) -> AsyncGenerator[str, None]:
     """Run the agentic loop and yield SSE events.
 
     Yields SSE-formatted strings:
@@ -44,7 +47,11 @@ async def stream_agent_response(messages: list[dict], user_email: str | None = N
             logger.warning("Failed to parse AGENT_USER_MAPPINGS config")
 
     client = anthropic.AsyncAnthropic(api_key=config.ANTHROPIC_API_KEY)
-    api_client = AgentAPIClient(base_url=config.AGENT_API_BASE_URL)
+    api_client = AgentAPIClient(base_url=config.AGENT_API_BASE_URL, read_primary_until=read_primary_until)
+
+    # Model calls made, and how the turn ended ("incomplete": error or client gone)
+    iterations = 0
+    outcome = "incomplete"
 
     try:
         # Build the messages for the Anthropic API
@@ -61,6 +68,7 @@ async def stream_agent_response(messages: list[dict], user_email: str | None = N
 
         # Agentic loop
         for iteration in range(config.AGENT_MAX_TOOL_ROUNDS):
+            iterations = iteration + 1
             logger.info("Agent iteration %d/%d", iteration + 1, config.AGENT_MAX_TOOL_ROUNDS)
 
             # Stream Anthropic API response — text deltas arrive in real time
@@ -78,12 +86,14 @@ async def stream_agent_response(messages: list[dict], user_email: str | None = N
                     yield _sse_event("chunk", {"content": text})
 
                 response = await stream.get_final_message()
+            _record_token_usage(response)
 
             # Check if the response contains tool use
             tool_use_blocks = [b for b in response.content if b.type == "tool_use"]
 
             if response.stop_reason == "end_turn" or not tool_use_blocks:
                 # Final answer was already streamed token-by-token
+                outcome = "completed"
                 yield _sse_event("done", {"status": "completed"})
                 return
 
@@ -105,7 +115,9 @@ async def stream_agent_response(messages: list[dict], user_email: str | None = N
 
                 t0 = time.monotonic()
                 result_str = await execute_tool(tool_block.name, tool_block.input, api_client)
-                duration_ms = round((time.monotonic() - t0) * 1000)
+                duration = time.monotonic() - t0
+                duration_ms = round(duration * 1000)
+                metrics.AGENT_TOOL_DURATION.labels(tool_block.name).observe(duration)
 
                 # Notify frontend about the tool call with full details
                 yield _sse_event("tool_call", {
@@ -128,6 +140,7 @@ async def stream_agent_response(messages: list[dict], user_email: str | None = N
             api_messages.append({"role": "user", "content": tool_results})
 
         # Max iterations reached
+        outcome = "max_iterations"
         yield _sse_event("chunk", {"content": "Se alcanzó el límite de iteraciones del asistente. Por favor, reformula tu pregunta de forma más específica."})
         yield _sse_event("done", {"status": "max_iterations"})
 
@@ -144,9 +157,24 @@ async def stream_agent_response(messages: list[dict], user_email: str | None = N
         logger.error("Agent error: %s", e, exc_info=True)
         yield _sse_event("error", {"message": "Error interno del asistente. Consulta los logs del backend."})
     finally:
+        if iterations:
+            metrics.AGENT_ITERATIONS.labels(outcome).observe(iterations)
         await api_client.close()
 
 
+def _record_token_usage(response) -> None:
+    """Add the token usage of one model response to the agent metrics."""
+    usage = response.usage
+    for token_type, count in (
+        ("input", usage.input_tokens),
+        ("output", usage.output_tokens),
+        ("cache_read", getattr(usage, "cache_read_input_tokens", None)),
+        ("cache_creation", getattr(usage, "cache_creation_input_tokens", None)),
+    ):
+        if count:
+            metrics.AGENT_TOKENS.labels(response.model, token_type).inc(count)
+
+
 def _serialize_content(content_blocks) -> list[dict]:
     """Serialize Anthropic content blocks to dicts for the messages array."""
     result = []
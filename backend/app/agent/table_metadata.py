@@ -9,6 +9,14 @@ TABLA_DESCRIPCIONES = {
 
 TABLAS_CON_BUSQUEDA = {"tareas"}
 
+# Columns returned by buscar_tareas unless the model asks for others.
+# Excludes the large notas_anteriores text, which is not part of the data model
+# described in the system prompt.
+CAMPOS_BUSQUEDA_TAREAS = [
+    "tarea_id", "tarea", "responsable", "descripcion",
+    "fecha_siguiente_accion", "tema", "estado",
+]
+
 
 def get_url_prefix(table_name: str) -> str:
     """Get the API URL prefix for a table."""
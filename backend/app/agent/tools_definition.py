@@ -23,7 +23,12 @@ AGENT_TOOLS = [
                 "orden_campo": {"type": "string", "description": "Campo para ordenar resultados"},
                 "orden_direccion": {"type": "string", "enum": ["asc", "desc"], "default": "asc"},
                 "limite": {"type": "integer", "default": 50, "description": "Maximo de resultados"},
-                "desplazamiento": {"type": "integer", "default": 0}
+                "desplazamiento": {"type": "integer", "default": 0},
+                "campos": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Campos a devolver (por defecto: tarea_id, tarea, responsable, descripcion, fecha_siguiente_accion, tema, estado). Pide solo los necesarios."
+                }
             }
         }
     },
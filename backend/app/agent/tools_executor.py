@@ -4,7 +4,7 @@ import logging
 
 from .api_client import AgentAPIClient, APIError
 from .config import MAX_QUERY_ROWS, DEFAULT_QUERY_ROWS
-from .table_metadata import get_url_prefix
+from .table_metadata import CAMPOS_BUSQUEDA_TAREAS, get_url_prefix
 
 LOG = logging.getLogger("task_manager_agent")
 
@@ -42,6 +42,7 @@ async def _buscar_tareas(tool_input: dict, api_client: AgentAPIClient) -> dict:
     offset = tool_input.get("desplazamiento", 0)
     order_by = tool_input.get("orden_campo")
     order_dir = tool_input.get("orden_direccion", "asc")
+    fields = tool_input.get("campos") or CAMPOS_BUSQUEDA_TAREAS
 
     search_body = {
         "filters": [{"field": f["field"], "operator": f["operator"], "value": f.get("value")} for f in filters],
@@ -49,6 +50,9 @@ async def _buscar_tareas(tool_input: dict, api_client: AgentAPIClient) -> dict:
         "order_dir": order_dir,
         "limit": limit,
         "offset": offset,
+        # Total comes back with the page itself (no separate COUNT query)
+        "count_mode": "window",
+        "fields": fields,
     }
 
     result = await api_client.search("tareas", search_body)
@@ -59,13 +63,7 @@ async def _obtener_tarea(tool_input: dict, api_client: AgentAPIClient) -> dict:
     """Get tarea details + acciones."""
     tarea_id = tool_input["tarea_id"]
 
-    tarea = await api_client.get_record("tareas", str(tarea_id))
-    acciones = await api_client.list_records(f"acciones/tarea/{tarea_id}")
-
-    return {
-        "tarea": tarea,
-        "acciones_realizadas": acciones,
-    }
+    return await api_client.get_record("tareas", f"{tarea_id}/completa")
 
 
 async def _buscar_acciones(tool_input: dict, api_client: AgentAPIClient) -> dict:
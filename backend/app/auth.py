@@ -1,48 +1,166 @@
-"""Authentication module for Clerk JWT and API key verification."""
-
+"""Authentication module for Clerk JWT and API key verification.
+
+JWT verification never blocks the event loop on the network: the JWKS is
+fetched with httpx and refreshed in the background every
+``JWKS_REFRESH_INTERVAL`` seconds (``run_jwks_refresh``, started by the app
+lifespan). A token signed with an unknown ``kid`` (key rotation) triggers one
+immediate refetch, at most every ``JWKS_MIN_REFETCH_INTERVAL`` seconds.
+
+Verified tokens are kept in an LRU cache keyed by the token's SHA-256 until
+their ``exp``, so the session token the frontend sends on every call is only
+checked (RS256 and claims) once. Entries whose signing key disappears from
+the JWKS are dropped on refresh.
+"""
+
+import asyncio
+import hashlib
 import hmac
 import logging
+import time
+from collections import OrderedDict
 
+import httpx
 import jwt
-from jwt import PyJWKClient
+from jwt import PyJWK, PyJWKSet
 from fastapi import HTTPException, Request
 
 from .config import settings
+from .timing import timed
 
 LOG = logging.getLogger("task_manager_backend")
 
-# Lazy-initialized JWKS client (only created when CLERK_JWKS_URL is configured)
-_jwks_client: PyJWKClient | None = None
-
-
-def _get_jwks_client() -> PyJWKClient | None:
-    """Get or create the JWKS client singleton."""
-    global _jwks_client
-    if _jwks_client is None and settings.CLERK_JWKS_URL:
-        _jwks_client = PyJWKClient(
-            settings.CLERK_JWKS_URL,
-            cache_keys=True,
-            lifespan=3600,
-        )
-        LOG.info("JWKS client initialized for %s", settings.CLERK_JWKS_URL)
-    return _jwks_client
-
-
-def _verify_jwt(token: str) -> dict:
+VERIFIED_TOKEN_CACHE_SIZE = 1024
+JWKS_FETCH_TIMEOUT = 10.0
+JWKS_MIN_REFETCH_INTERVAL = 30.0
+
+
+class _JWKSCache:
+    """Signing keys of ``CLERK_JWKS_URL`` by ``kid``."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.keys: dict[str, PyJWK] = {}
+        self._refetched_at: float | None = None  # Last refetch for an unknown kid
+        self._lock: asyncio.Lock | None = None
+
+    async def refresh(self) -> None:
+        """Fetch the key set; on failure the previous keys are kept."""
+        try:
+            async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+            keys = {key.key_id: key for key in PyJWKSet.from_dict(response.json()).keys if key.key_id}
+        except (httpx.HTTPError, ValueError, jwt.PyJWTError) as e:
+            LOG.warning("JWKS fetch from %s failed: %s", self.url, e)
+            return
+        if keys.keys() != self.keys.keys():
+            LOG.info("JWKS loaded from %s: key ids %s", self.url, sorted(keys))
+        self.keys = keys
+        _verified_tokens.discard_other_keys(keys.keys())
+
+    async def get_key(self, kid: str | None) -> PyJWK | None:
+        key = self.keys.get(kid)
+        if key is not None:
+            return key
+        # Unknown kid: the keys may have rotated since the last refresh
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            key = self.keys.get(kid)
+            now = time.monotonic()
+            recently = self._refetched_at is not None and now - self._refetched_at < JWKS_MIN_REFETCH_INTERVAL
+            if key is None and not recently:
+                self._refetched_at = now
+                await self.refresh()
+                key = self.keys.get(kid)
+        return key
+
+
+class _VerifiedTokenCache:
+    """LRU of verified JWT claims, keyed by token hash, valid until ``exp``."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: OrderedDict[bytes, tuple[dict, float, str | None]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        claims, expires_at, _ = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, token: str, claims: dict, kid: str | None) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        self._entries[self._key(token)] = (claims, float(expires_at), kid)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def discard_other_keys(self, kids) -> None:
+        """Drop tokens signed with a key that is no longer published."""
+        for key in [key for key, (_, _, kid) in self._entries.items() if kid not in kids]:
+            del self._entries[key]
+
+
+_verified_tokens = _VerifiedTokenCache(VERIFIED_TOKEN_CACHE_SIZE)
+
+# Lazy-initialized JWKS cache (only created when CLERK_JWKS_URL is configured)
+_jwks: _JWKSCache | None = None
+
+
+def _get_jwks() -> _JWKSCache | None:
+    """Get or create the JWKS cache singleton."""
+    global _jwks
+    if _jwks is None and settings.CLERK_JWKS_URL:
+        _jwks = _JWKSCache(settings.CLERK_JWKS_URL)
+        LOG.info("JWKS cache initialized for %s", settings.CLERK_JWKS_URL)
+    return _jwks
+
+
+async def run_jwks_refresh() -> None:
+    """Fetch the JWKS now and then every ``JWKS_REFRESH_INTERVAL`` seconds (background task)."""
+    jwks = _get_jwks()
+    if jwks is None:
+        return
+    while True:
+        await jwks.refresh()
+        await asyncio.sleep(settings.JWKS_REFRESH_INTERVAL)
+
+
+async def _verify_jwt(token: str) -> dict:
     """Decode and verify a Clerk JWT token.
 
-    Returns the decoded claims on success.
+    Returns the decoded claims on success (from the cache when the token was
+    already verified).
     Raises HTTPException on failure.
     """
-    client = _get_jwks_client()
-    if client is None:
+    claims = _verified_tokens.get(token)
+    if claims is not None:
+        return claims
+
+    jwks = _get_jwks()
+    if jwks is None:
         raise HTTPException(
             status_code=401,
             detail="JWT authentication is not configured",
         )
 
     try:
-        signing_key = client.get_signing_key_from_jwt(token)
+        kid = jwt.get_unverified_header(token).get("kid")
+        signing_key = await jwks.get_key(kid)
+        if signing_key is None:
+            raise jwt.InvalidTokenError(f"Unable to find a signing key that matches: {kid}")
         payload = jwt.decode(
             token,
             signing_key.key,
@@ -65,6 +183,7 @@ def _verify_jwt(token: str) -> dict:
         LOG.warning("JWT rejected: unauthorized origin '%s'", azp)
         raise HTTPException(status_code=403, detail="Unauthorized origin")
 
+    _verified_tokens.put(token, payload, kid)
     return payload
 
 
@@ -76,12 +195,31 @@ async def verify_auth(request: Request) -> dict:
     2. API key via X-API-Key header
 
     Returns auth info dict on success, raises HTTPException(401) on failure.
+    The time spent is reported as ``auth`` in the Server-Timing header.
     """
+    with timed("auth"):
+        return await _authenticate(request)
+
+
+async def verify_api_key(request: Request) -> None:
+    """FastAPI dependency for machine endpoints (``/metrics``): the API key only.
+
+    Accepted in ``X-API-Key`` or as ``Authorization: Bearer <API_KEY>`` (the
+    form Prometheus sends with ``authorization.credentials``). Raises 401.
+    """
+    auth_header = request.headers.get("authorization", "")
+    api_key = request.headers.get("x-api-key", "") or (auth_header[7:] if auth_header.startswith("Bearer ") else "")
+    if not (settings.API_KEY and api_key and hmac.compare_digest(api_key, settings.API_KEY)):
+        raise HTTPException(status_code=401, detail="API key required")
+
+
+async def _authenticate(request: Request) -> dict:
+    """Check the request credentials (see ``verify_auth``)."""
     # 1. Try JWT authentication
     auth_header = request.headers.get("authorization", "")
     if auth_header.startswith("Bearer "):
         token = auth_header[7:]
-        claims = _verify_jwt(token)
+        claims = await _verify_jwt(token)
         user_id = claims.get("sub", "unknown")
         LOG.info("JWT auth successful for user %s", user_id)
         LOG.debug("JWT claims: %s", {k: v for k, v in claims.items() if k != "raw"})
@@ -0,0 +1,299 @@
+"""
+HTTP response compression.
+
+``CompressionMiddleware`` compresses responses with the best encoding the
+client accepts (``Accept-Encoding``) among ``COMPRESSION_ENCODINGS``, in the
+server's order of preference. It is a pure ASGI middleware, so streamed
+responses (exports) are compressed chunk by chunk without buffering. It skips:
+
+- bodies smaller than ``COMPRESSION_MINIMUM_SIZE`` (sent in one piece),
+- responses that are already encoded (``Content-Encoding``),
+- content types that do not compress (zip, gzip, images, ...) and
+  ``text/event-stream``, so agent SSE events are delivered as they happen.
+
+``precompressed_json()`` is for payloads that rarely change (README,
+parametric lists): the serialized body and its compressed variants are cached
+under a key the caller has before building the payload (the endpoint and its
+data version), so a repeated request skips serialization and compression.
+
+``br`` needs the ``brotli`` package and ``zstd`` the ``zstandard`` package;
+encodings whose package is missing are dropped (with a warning) on first use.
+"""
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import cache
+from typing import Any
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# Distinct payloads kept by precompressed_json()
+PRECOMPRESSED_CACHE_SIZE = 64
+
+_COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+class _GzipCompressor:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self):
+        import zstandard
+
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+_COMPRESSORS = {"gzip": _GzipCompressor, "br": _BrotliCompressor, "zstd": _ZstdCompressor}
+_REQUIRED_PACKAGES = {"br": "brotli", "zstd": "zstandard"}
+
+
+def available_encodings(encodings: list[str]) -> list[str]:
+    """``encodings`` without the unknown ones and those whose package is missing."""
+    available = []
+    for encoding in encodings:
+        if encoding not in _COMPRESSORS:
+            logger.warning(f"Unknown compression encoding ignored: {encoding}")
+            continue
+        package = _REQUIRED_PACKAGES.get(encoding)
+        if package:
+            try:
+                __import__(package)
+            except ImportError:
+                logger.warning(f"Compression '{encoding}' disabled: package '{package}' is not installed")
+                continue
+        available.append(encoding)
+    return available
+
+
+@cache
+def configured_encodings() -> list[str]:
+    """``COMPRESSION_ENCODINGS`` that can be used (checked once, on first use)."""
+    return available_encodings(settings.COMPRESSION_ENCODINGS)
+
+
+def negotiate_encoding(accept_encoding: str, encodings: list[str]) -> str | None:
+    """Pick the encoding for a request from its ``Accept-Encoding`` header.
+
+    The highest client q-value wins; ties go to the first in ``encodings``.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    compressor = _COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.flush()
+
+
+def _is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "text/event-stream":
+        return False
+    return media_type.startswith("text/") or media_type in _COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses negotiated through ``Accept-Encoding``."""
+
+    def __init__(self, app: ASGIApp, encodings: list[str] | None = None, minimum_size: int | None = None):
+        self.app = app
+        self.encodings = configured_encodings() if encodings is None else encodings
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    """``send`` wrapper that decides on the first body chunk whether to compress."""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk tells us the body size
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            compressible = (
+                "content-encoding" not in headers
+                and self.start["status"] not in (204, 304)
+                and _is_compressible(headers.get("content-type", ""))
+            )
+            if compressible:
+                _add_vary(headers)
+            if not compressible or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+
+            self.compressor = _COMPRESSORS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                # Streamed: the compressed length is unknown
+                del headers["content-length"]
+                await self.send(self.start)
+            else:
+                data = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(data))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": data})
+                return
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.flush()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+class _PrecompressedPayload:
+    """A serialized JSON body and its compressed variants, built on demand."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._variants: dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._variants.get(encoding)
+        if data is None:
+            data = self._variants[encoding] = compress(self.body, encoding)
+        return data
+
+
+class _PrecompressedCache:
+    """Recently served payloads, keyed by the caller's endpoint and data version."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _PrecompressedPayload] = OrderedDict()
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> _PrecompressedPayload:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                return payload
+        content = build()
+        payload = _PrecompressedPayload(
+            json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        )
+        with self._lock:
+            self._entries[key] = payload
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return payload
+
+
+_precompressed = _PrecompressedCache(PRECOMPRESSED_CACHE_SIZE)
+
+
+def precompressed_json(request: Request, key: Hashable, build: Callable[[], Any]) -> Response:
+    """JSON response cached, serialized and compressed, under ``key``.
+
+    ``key`` identifies the payload and its data version (e.g. the endpoint and
+    the rows it is built from); ``build()`` returns the content and is only
+    called when ``key`` is not cached. The response carries its own
+    ``Content-Encoding``, so the middleware leaves it alone.
+    """
+    payload = _precompressed.get(key, build)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), configured_encodings())
+    if encoding is None or len(payload.body) < settings.COMPRESSION_MINIMUM_SIZE:
+        return Response(payload.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(payload.encoded(encoding), media_type="application/json", headers=headers)
@@ -4,10 +4,12 @@ import logging
 from datetime import datetime
 from typing import Any, Generic, TypeVar
 
-from sqlalchemy import func, inspect
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy import ARRAY, Integer, any_, bindparam, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import Base
+from app.pagination import keyset_filter, order_clauses, split_page
 
 LOG = logging.getLogger("task_manager_backend")
 
@@ -21,49 +23,112 @@ def model_to_dict(obj) -> dict:
     return {c.key: getattr(obj, c.key) for c in inspect(obj).mapper.column_attrs}
 
 
+def resolve_fields(model: type[Base], fields: list[str] | None) -> list[str] | None:
+    """Validate a column projection; the primary key is always included.
+
+    Returns None when no projection was requested (all columns).
+    Raises HTTPException(400) for unknown field names.
+    """
+    if not fields:
+        return None
+    columns = inspect(model).columns
+    invalid = [f for f in fields if f not in columns]
+    if invalid:
+        LOG.warning(f"Invalid fields for {model.__tablename__}: {invalid}")
+        raise HTTPException(status_code=400, detail=f"Invalid field(s): {', '.join(invalid)}")
+    pk = inspect(model).mapper.primary_key[0].key
+    return [pk] + [f for f in dict.fromkeys(fields) if f != pk]
+
+
+def projection_select(model: type[Base], fields: list[str], extra: list[str] = ()):
+    """SELECT only ``fields`` (plus ``extra`` columns needed for paging)."""
+    table = inspect(model).local_table
+    return select(*(table.c[name] for name in dict.fromkeys([*fields, *extra])))
+
+
+def row_to_dict(row, fields: list[str]) -> dict:
+    """Convert a projected result row to a dictionary of ``fields``."""
+    mapping = row._mapping
+    return {name: mapping[name] for name in fields}
+
+
+def parse_fields_param(fields: str | None) -> list[str] | None:
+    """Split a comma-separated ``fields`` query parameter."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def any_id(column, ids: list[int], name: str = "ids"):
+    """``column = ANY(:ids)``: a single array parameter, whatever the list size."""
+    return column == any_(bindparam(name, list(ids), type_=ARRAY(Integer)))
+
+
 class CRUDBase(Generic[ModelType]):
-    """Generic CRUD operations for a SQLAlchemy model."""
+    """Generic async CRUD operations for a SQLAlchemy model."""
 
     def __init__(self, model: type[ModelType]):
         self.model = model
 
-    def get(self, db: Session, id: Any) -> ModelType | None:
+    async def get(self, db: AsyncSession, id: Any) -> ModelType | None:
         """Get a record by primary key."""
-        pk = inspect(self.model).mapper.primary_key[0]
-        return db.query(self.model).filter(pk == id).first()
-
-    def get_multi(self, db: Session, skip: int = 0, limit: int = 100) -> list[ModelType]:
-        """Get multiple records with pagination."""
-        return db.query(self.model).offset(skip).limit(limit).all()
-
-    def count(self, db: Session) -> int:
+        return await db.get(self.model, id)
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        limit: int = 100,
+        skip: int = 0,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Get a page ordered by primary key as dicts, plus the next-page cursor.
+
+        With a cursor the page is located by keyset seek and ``skip`` is ignored.
+        ``fields`` restricts the SELECT (and the dicts) to those columns.
+        """
+        fields = resolve_fields(self.model, fields)
+        query = select(self.model) if fields is None else projection_select(self.model, fields)
+        query = query.order_by(*order_clauses(self.model, None, "asc"))
+        if cursor:
+            query = query.where(keyset_filter(self.model, cursor, None, "asc"))
+        else:
+            query = query.offset(skip)
+        result = await db.execute(query.limit(limit + 1))
+        if fields is None:
+            rows, next_cursor = split_page(list(result.scalars().all()), limit, self.model, None, "asc")
+            return [model_to_dict(row) for row in rows], next_cursor
+        rows, next_cursor = split_page(list(result.all()), limit, self.model, None, "asc")
+        return [row_to_dict(row, fields) for row in rows], next_cursor
+
+    async def count(self, db: AsyncSession) -> int:
         """Count all records."""
-        return db.query(func.count()).select_from(self.model).scalar()
+        return await db.scalar(select(func.count()).select_from(self.model))
 
-    def create(self, db: Session, obj_in: dict) -> ModelType:
+    async def create(self, db: AsyncSession, obj_in: dict) -> ModelType:
         """Create a new record."""
         db_obj = self.model(**obj_in)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def update(self, db: Session, db_obj: ModelType, obj_in: dict) -> ModelType:
+    async def update(self, db: AsyncSession, db_obj: ModelType, obj_in: dict) -> ModelType:
         """Update an existing record."""
         for field, value in obj_in.items():
             if value is not None:
                 setattr(db_obj, field, value)
         if hasattr(db_obj, "fecha_actualizacion"):
             db_obj.fecha_actualizacion = datetime.now()
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def delete(self, db: Session, id: Any) -> bool:
+    async def delete(self, db: AsyncSession, id: Any) -> bool:
         """Delete a record by primary key."""
-        obj = self.get(db, id)
+        obj = await self.get(db, id)
         if obj:
-            db.delete(obj)
-            db.commit()
+            await db.delete(obj)
+            await db.commit()
             return True
         return False
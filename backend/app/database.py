@@ -1,25 +1,177 @@
 """
 Database connection setup for the backend API.
+
+Two engines share the same PostgreSQL database:
+- ``async_engine`` (asyncpg, or psycopg 3 with ``DB_DRIVER``, see
+  ``app/drivers.py``) backs the API routers through ``get_db``.
+- ``engine`` (psycopg2) is kept for synchronous callers such as bulk
+  admin jobs and scripts, available through ``get_sync_db``.
+
+With ``DB_REPLICA_DSNS`` set, read-only endpoints use ``get_read_db`` and the
+export uses ``read_engine()``: both are served by a healthy replica (see
+``app/replicas.py``) or, failing that, by the primary. A write response from
+``get_db`` carries ``READ_PRIMARY_HEADER`` with the time until which the
+client's reads must stay on the primary; clients echo the last value they
+received on every request (a header rather than a cookie, since the frontend
+calls the API cross-origin without credentials), so they never miss their own
+writes because of replication lag.
 """
-from sqlalchemy import create_engine
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app import metrics
 from app.config import settings
+from app.drivers import SYNC_DRIVERNAME, async_connect_args, async_drivername
+from app.pool_metrics import AsyncPoolClass, SyncPoolClass, pool_status
+from app.query_limits import use_statement_timeout
+from app.replicas import ReplicaSet
+from app.slow_queries import instrument_slow_queries
+from app.timing import instrument_engine
+
+_DB_CREDENTIALS = f"{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+DATABASE_URL = f"{SYNC_DRIVERNAME}://{_DB_CREDENTIALS}"
+ASYNC_DATABASE_URL = f"{async_drivername()}://{_DB_CREDENTIALS}"
 
-DATABASE_URL = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+_POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
 
 engine = create_engine(
     DATABASE_URL,
     echo=settings.DATABASE_ECHO,
+    poolclass=SyncPoolClass,
+    **_POOL_OPTIONS,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.DATABASE_ECHO,
+    poolclass=AsyncPoolClass,
+    connect_args=async_connect_args(),
+    **_POOL_OPTIONS,
+)
+
+# expire_on_commit=False: routers serialize objects after commit, and an
+# expired attribute would trigger an implicit (unsupported) async lazy load.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+replicas = ReplicaSet(settings.DB_REPLICA_DSNS, _POOL_OPTIONS)
+
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+
+def all_engines() -> list[Engine]:
+    """Sync ``Engine`` objects of the primary and the replicas (async ones via ``sync_engine``)."""
+    engines = [engine, async_engine.sync_engine]
+    for replica in replicas.replicas:
+        engines += [replica.engine, replica.async_engine.sync_engine]
+    return engines
+
+
+# Statement time of every engine goes into the Server-Timing ``db`` metric
+for _engine in all_engines():
+    instrument_engine(_engine)
+instrument_slow_queries(all_engines(), explain_engine=engine)
+
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency that provides a database session."""
+def get_pool_stats() -> dict:
+    """Occupancy and checkout metrics for every connection pool."""
+    stats = {
+        "async": pool_status(async_engine.sync_engine.pool),
+        "sync": pool_status(engine.pool),
+    }
+    for replica in replicas.replicas:
+        stats[f"{replica.name}-async"] = pool_status(replica.async_engine.sync_engine.pool)
+        stats[f"{replica.name}-sync"] = pool_status(replica.engine.pool)
+    return stats
+
+
+def mark_primary_reads(request: Request, response: Response) -> None:
+    """After a write, send the client's reads to the primary for ``DB_REPLICA_STICKY_SECONDS``."""
+    if replicas and request.method not in ("GET", "HEAD"):
+        response.headers[READ_PRIMARY_HEADER] = f"{time.time() + settings.DB_REPLICA_STICKY_SECONDS:.3f}"
+
+
+def reads_primary(request: Request) -> bool:
+    """Whether the client echoed a ``READ_PRIMARY_HEADER`` that has not expired yet."""
+    try:
+        return float(request.headers.get(READ_PRIMARY_HEADER, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_db(request: Request, response: Response):
+    """Dependency that provides an async database session on the primary."""
+    mark_primary_reads(request, response)
+    use_statement_timeout(request)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def _replica_session() -> AsyncSession | None:
+    """A session on the next healthy replica, already connected, or None."""
+    replica = replicas.pick()
+    if replica is None:
+        return None
+    db = AsyncSessionLocal(bind=replica.async_engine)
+    try:
+        await db.connection()
+    except (exc.DBAPIError, OSError) as e:
+        await db.close()
+        replicas.mark_down(replica, str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__)
+        return None
+    metrics.DB_READ_SESSIONS.labels(replica.name).inc()
+    return db
+
+
+async def get_read_db(request: Request):
+    """Dependency that provides an async session for read-only endpoints.
+
+    Served by a replica when one is healthy and the client has not written
+    recently, otherwise by the primary.
+    """
+    use_statement_timeout(request)
+    db = None
+    if replicas and not reads_primary(request):
+        db = await _replica_session()
+    if db is None:
+        metrics.DB_READ_SESSIONS.labels("primary").inc()
+        db = AsyncSessionLocal()
+    async with db:
+        yield db
+
+
+def read_engine() -> Engine:
+    """Sync engine for a long read-only job (export): a healthy replica or the primary."""
+    replica = replicas.pick()
+    if replica is None:
+        metrics.DB_READ_SESSIONS.labels("primary").inc()
+        return engine
+    metrics.DB_READ_SESSIONS.labels(replica.name).inc()
+    return replica.engine
+
+
+def get_sync_db():
+    """Dependency that provides a synchronous database session."""
     db = SessionLocal()
     try:
         yield db
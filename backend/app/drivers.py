@@ -0,0 +1,57 @@
+"""
+PostgreSQL driver of the async engines.
+
+``DB_DRIVER`` selects the driver behind the API's async engines (primary and
+read replicas):
+
+- ``asyncpg`` (default): every statement is prepared on the server and kept
+  in asyncpg's per-connection statement cache.
+- ``psycopg`` (psycopg 3, ``task-manager-backend[psycopg]``): a statement is
+  prepared on the server once a connection has executed it
+  ``DB_PREPARE_THRESHOLD`` times. The parametric lists and primary-key
+  lookups run the same few statements over and over, so they skip the parse
+  and plan steps after that. ``pipeline.run_statements`` sends multi-statement
+  write flows in one pipeline. The async psycopg connection needs a selector
+  event loop (not the default Proactor loop on Windows).
+
+With either driver, new connections of the async engines start with
+``statement_timeout = DB_STATEMENT_TIMEOUT_MS`` (asyncpg ``server_settings``,
+psycopg ``options``), so ``query_limits`` only has to issue ``SET LOCAL`` for
+route classes with a different timeout.
+
+Set ``DB_PREPARE_THRESHOLD=-1`` behind a transaction-pooling PgBouncer, which
+cannot keep prepared statements across transactions. The sync engines stay on
+psycopg2: the COPY restore and the slow-query EXPLAIN use its API.
+"""
+import math
+
+from app.config import settings
+
+SYNC_DRIVERNAME = "postgresql+psycopg2"
+
+_ASYNC_DRIVERNAMES = {
+    "asyncpg": "postgresql+asyncpg",
+    "psycopg": "postgresql+psycopg",
+}
+
+
+def async_drivername(driver: str | None = None) -> str:
+    """SQLAlchemy dialect+driver name for the async engines (``DB_DRIVER`` by default)."""
+    return _ASYNC_DRIVERNAMES[driver or settings.DB_DRIVER]
+
+
+def async_connect_args(connect_timeout: float | None = None, driver: str | None = None) -> dict:
+    """Driver connect arguments for the async engines (``DB_DRIVER`` by default)."""
+    timeout_ms = int(settings.DB_STATEMENT_TIMEOUT_MS)
+    if (driver or settings.DB_DRIVER) == "psycopg":
+        threshold = settings.DB_PREPARE_THRESHOLD
+        args = {"prepare_threshold": threshold if threshold >= 0 else None}
+        if connect_timeout:
+            args["connect_timeout"] = max(1, math.ceil(connect_timeout))
+        if timeout_ms:
+            args["options"] = f"-c statement_timeout={timeout_ms}"
+        return args
+    args = {"timeout": connect_timeout} if connect_timeout else {}
+    if timeout_ms:
+        args["server_settings"] = {"statement_timeout": str(timeout_ms)}
+    return args
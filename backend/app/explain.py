@@ -0,0 +1,50 @@
+"""
+EXPLAIN support for SQLAlchemy statements.
+
+``Explain(stmt)`` wraps any selectable so it can be executed like a normal
+statement; bound parameters are compiled by the active dialect, so the same
+construct works on the async (asyncpg) and sync (psycopg2) engines.
+"""
+import json
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.expression import ClauseElement
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement.
+
+    ``analyze=True`` executes the statement (``EXPLAIN ANALYZE``); only use it
+    for reads or inside a transaction that is rolled back.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) " + compiler.process(element.statement, **kw)
+
+
+def parse_plan(raw: Any) -> dict:
+    """Return the top-level plan node from an EXPLAIN (FORMAT JSON) result.
+
+    psycopg2 decodes the json column; asyncpg returns it as text.
+    """
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    return raw[0]["Plan"]
+
+
+async def explain_plan(db: AsyncSession, statement) -> dict:
+    """Run EXPLAIN for ``statement`` and return its top-level plan node."""
+    raw = await db.scalar(Explain(statement))
+    return parse_plan(raw)
@@ -0,0 +1,320 @@
+"""
+Streaming database export.
+
+Every format reads each table through a server-side cursor in batches of
+``EXPORT_BATCH_SIZE`` rows and emits bytes as it goes, so memory use does not
+depend on table size. All tables are read in one REPEATABLE READ transaction,
+so the export is a consistent snapshot however long the download takes.
+
+Formats:
+- ``json``: one document, ``{"data": {table: [rows]}, "export_metadata": {...}}``.
+- ``ndjson``: one ``{"table": ..., "data": {row}}`` line per row, then an
+  ``{"export_metadata": {...}}`` line.
+- ``csv``: zip with one CSV (header row first, NULL as an unquoted empty cell)
+  per table plus ``export_metadata.json``.
+- ``parquet``: zip with one Parquet file per table plus ``export_metadata.json``
+  (requires ``pyarrow``).
+
+``json`` and ``ndjson`` can be compressed as a whole with gzip or zstd
+(``zstandard``); for ``parquet`` the compression selects the column codec.
+"""
+import csv
+import io
+import json
+import logging
+import zipfile
+import zlib
+from collections.abc import Iterator
+from datetime import date, datetime
+from typing import Literal
+
+from sqlalchemy import Date, DateTime, Integer, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, read_engine
+from app.models import EstadoTarea, EstadoAccion, Responsable, Tarea, AccionRealizada
+
+LOG = logging.getLogger("task_manager_backend")
+
+ExportFormat = Literal["json", "ndjson", "csv", "parquet"]
+ExportCompression = Literal["gzip", "zstd"]
+
+# Tables in dependency order: reference tables first, then main, then dependent
+EXPORT_TABLES = [
+    ("estados_tareas", EstadoTarea),
+    ("estados_acciones", EstadoAccion),
+    ("responsables", Responsable),
+    ("tareas", Tarea),
+    ("acciones_realizadas", AccionRealizada),
+]
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+METADATA_FILENAME = "export_metadata.json"
+
+_EXTENSIONS = {"json": "json", "ndjson": "ndjson", "csv": "csv.zip", "parquet": "parquet.zip"}
+_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "application/zip",
+    "parquet": "application/zip",
+}
+_COMPRESSED = {"gzip": ("gz", "application/gzip"), "zstd": ("zst", "application/zstd")}
+
+
+class ExportError(ValueError):
+    """The requested format/compression cannot be produced."""
+
+
+def check_export_options(fmt: ExportFormat, compression: ExportCompression | None) -> None:
+    """Raise ExportError for unsupported combinations or missing optional packages."""
+    if fmt == "csv" and compression:
+        raise ExportError("csv export is already a deflate-compressed zip; omit compression")
+    if fmt == "parquet":
+        _require("pyarrow", "parquet export")
+    if compression == "zstd" and fmt != "parquet":
+        _require("zstandard", "zstd compression")
+
+
+def _require(module: str, feature: str) -> None:
+    try:
+        __import__(module)
+    except ImportError:
+        raise ExportError(f"{feature} requires the '{module}' package (install task-manager-backend[export])")
+
+
+def export_filename(fmt: ExportFormat, compression: ExportCompression | None, timestamp: str) -> str:
+    name = f"task_manager_export_{timestamp}.{_EXTENSIONS[fmt]}"
+    if compression and fmt in ("json", "ndjson"):
+        name += "." + _COMPRESSED[compression][0]
+    return name
+
+
+def export_media_type(fmt: ExportFormat, compression: ExportCompression | None) -> str:
+    if compression and fmt in ("json", "ndjson"):
+        return _COMPRESSED[compression][1]
+    return _MEDIA_TYPES[fmt]
+
+
+def _serialize_row(row_dict: dict) -> dict:
+    """Convert date/datetime values to ISO 8601 strings for JSON serialization."""
+    result = {}
+    for key, value in row_dict.items():
+        if isinstance(value, datetime):
+            result[key] = value.isoformat()
+        elif isinstance(value, date):
+            result[key] = value.isoformat()
+        else:
+            result[key] = value
+    return result
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _table_batches(db: Session, model) -> Iterator[list[dict]]:
+    """Rows of ``model``'s table in primary key order, one cursor fetch at a time."""
+    table = model.__table__
+    result = db.execute(
+        select(table).order_by(*table.primary_key.columns).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for batch in result.partitions():
+        yield [dict(row._mapping) for row in batch]
+
+
+def _metadata(exported_at: str, record_counts: dict) -> dict:
+    return {
+        "exported_at": exported_at,
+        "version": "1.0",
+        "tables": [name for name, _ in EXPORT_TABLES],
+        "record_counts": record_counts,
+    }
+
+
+# --- Writers: each yields bytes and fills record_counts ---
+
+def _write_json(db: Session, exported_at: str, record_counts: dict) -> Iterator[bytes]:
+    # The record counts are only known at the end, so export_metadata follows data
+    yield b'{"data":{'
+    for index, (table_name, model) in enumerate(EXPORT_TABLES):
+        yield f'{"," if index else ""}{_dumps(table_name)}:['.encode()
+        count = 0
+        for batch in _table_batches(db, model):
+            chunk = ",".join(_dumps(_serialize_row(row)) for row in batch)
+            yield f'{"," if count else ""}{chunk}'.encode()
+            count += len(batch)
+        yield b"]"
+        record_counts[table_name] = count
+    yield f'}},"export_metadata":{_dumps(_metadata(exported_at, record_counts))}}}'.encode()
+
+
+def _write_ndjson(db: Session, exported_at: str, record_counts: dict) -> Iterator[bytes]:
+    for table_name, model in EXPORT_TABLES:
+        count = 0
+        prefix = f'{{"table":{_dumps(table_name)},"data":'
+        for batch in _table_batches(db, model):
+            yield "".join(f"{prefix}{_dumps(_serialize_row(row))}}}\n" for row in batch).encode()
+            count += len(batch)
+        record_counts[table_name] = count
+    yield f'{{"export_metadata":{_dumps(_metadata(exported_at, record_counts))}}}\n'.encode()
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable target for ZipFile; hands out what was written."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _write_zip(
+    db: Session,
+    exported_at: str,
+    record_counts: dict,
+    extension: str,
+    compress_type: int,
+    write_table,
+) -> Iterator[bytes]:
+    """Zip with one member per table (written by ``write_table``) plus the metadata."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=compress_type) as archive:
+        for table_name, model in EXPORT_TABLES:
+            with archive.open(f"{table_name}.{extension}", "w", force_zip64=True) as member:
+                count = 0
+                for batch_size in write_table(member, model):
+                    count += batch_size
+                    yield sink.drain()
+            record_counts[table_name] = count
+            yield sink.drain()
+        archive.writestr(METADATA_FILENAME, _dumps(_metadata(exported_at, record_counts)))
+    yield sink.drain()
+
+
+def _write_csv(db: Session, exported_at: str, record_counts: dict) -> Iterator[bytes]:
+    def write_table(member, model) -> Iterator[int]:
+        columns = [column.key for column in model.__table__.columns]
+        text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+        # Every value is quoted except NULL, so COPY (FORMAT csv) can tell
+        # NULL (empty cell) from an empty string ("")
+        writer = csv.writer(text, quoting=csv.QUOTE_NOTNULL)
+        writer.writerow(columns)
+        for batch in _table_batches(db, model):
+            writer.writerows([_serialize_row(row)[c] for c in columns] for row in batch)
+            text.flush()
+            yield len(batch)
+        text.detach()
+
+    yield from _write_zip(db, exported_at, record_counts, "csv", zipfile.ZIP_DEFLATED, write_table)
+
+
+def _arrow_schema(model):
+    import pyarrow as pa
+
+    def arrow_type(column):
+        if isinstance(column.type, Integer):
+            return pa.int64()
+        if isinstance(column.type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(column.type, Date):
+            return pa.date32()
+        return pa.string()
+
+    return pa.schema([pa.field(c.key, arrow_type(c), nullable=c.nullable) for c in model.__table__.columns])
+
+
+class _TellingWriter(io.RawIOBase):
+    """Adds the ``tell()`` that pyarrow needs to a non-seekable zip member."""
+
+    def __init__(self, member):
+        self._member = member
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        written = self._member.write(data)
+        self._position += written
+        return written
+
+    def tell(self) -> int:
+        return self._position
+
+
+def _write_parquet(db: Session, exported_at: str, record_counts: dict, codec: str) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def write_table(member, model) -> Iterator[int]:
+        schema = _arrow_schema(model)
+        # One row group per cursor batch keeps memory flat
+        with pq.ParquetWriter(_TellingWriter(member), schema, compression=codec) as writer:
+            for batch in _table_batches(db, model):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                yield len(batch)
+
+    # Parquet pages are compressed already; the zip only stores them
+    yield from _write_zip(db, exported_at, record_counts, "parquet", zipfile.ZIP_STORED, write_table)
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _zstd(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor().compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(
+    fmt: ExportFormat,
+    compression: ExportCompression | None,
+    exported_at: str,
+) -> Iterator[bytes]:
+    """Yield the export file in ``fmt`` as bytes chunks.
+
+    Call ``check_export_options`` first; errors raised once streaming has
+    started can no longer become an HTTP error status.
+    """
+    record_counts = {}
+    # The session lives in the generator: it has to stay open while the
+    # response body is being sent. A replica serves it when one is healthy.
+    with SessionLocal(bind=read_engine()) as db:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        if fmt == "parquet":
+            chunks = _write_parquet(db, exported_at, record_counts, codec=compression or "snappy")
+        else:
+            writer = {"json": _write_json, "ndjson": _write_ndjson, "csv": _write_csv}[fmt]
+            chunks = writer(db, exported_at, record_counts)
+            if compression == "gzip":
+                chunks = _gzip(chunks)
+            elif compression == "zstd":
+                chunks = _zstd(chunks)
+        yield from chunks
+
+    total = sum(record_counts.values())
+    LOG.info(f"Database export completed ({fmt}, {compression or 'uncompressed'}): {record_counts} (total: {total})")
@@ -1,18 +1,28 @@
 """FastAPI application entry point for Task Manager."""
 
+import asyncio
+import atexit
 import logging
+import os
+import queue
 import sys
-import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy.exc import DBAPIError
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
-from .config import settings, get_app_version, SENSITIVE_PATTERNS
+from . import metrics
+from .auth import run_jwks_refresh, verify_api_key
+from .compression import CompressionMiddleware
+from .config import settings, get_app_version, is_sensitive
+from .database import READ_PRIMARY_HEADER, async_engine, get_pool_stats, replicas
+from .query_limits import statement_timeout_handler
 from .routers import tareas, acciones, estados, responsables, agent, admin, ayuda
+from .timing import TimingMiddleware
 
 # Setup logging
 _backend_dir = Path(__file__).parent.parent
@@ -23,13 +33,36 @@ _logs_dir.mkdir(exist_ok=True)
 if sys.platform == "win32" and hasattr(sys.stderr, "reconfigure"):
     sys.stderr.reconfigure(encoding="utf-8", errors="replace")
 
+# Handlers run on a QueueListener thread, so request handlers never wait
+# on the log file or the console; the QueueHandler only renders the message.
+_log_formatter = logging.Formatter(settings.LOG_FORMAT)
+_log_handlers = [
+    logging.FileHandler(_logs_dir / settings.LOG_FILE, encoding="utf-8"),
+    logging.StreamHandler(),
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+
+
+def _restart_log_listener():
+    """Start a new listener thread in a forked worker (threads do not survive fork)."""
+    global _log_listener
+    _log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+    _log_listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_log_listener)
+atexit.register(lambda: _log_listener.stop())
+
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
 logging.basicConfig(
     level=getattr(logging, settings.LOG_LEVEL),
-    format=settings.LOG_FORMAT,
-    handlers=[
-        logging.FileHandler(_logs_dir / settings.LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
+    handlers=[_queue_handler],
 )
 
 # Disable Uvicorn's default access log
@@ -42,33 +75,20 @@ for _noisy_logger in ("httpcore", "anthropic", "httpx", "hpack"):
 logger = logging.getLogger(__name__)
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log all API requests."""
-
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        duration_ms = (time.time() - start_time) * 1000
-
-        path = request.url.path
-        if path not in ["/health", "/", f"{settings.API_PREFIX}/docs", f"{settings.API_PREFIX}/redoc", f"{settings.API_PREFIX}/openapi.json"]:
-            logger.info(
-                f"{request.method} {path} - "
-                f"Status: {response.status_code} - "
-                f"Duration: {duration_ms:.1f}ms"
-            )
-
-        return response
-
-
 def _mask_value(field_name: str, value) -> str:
     """Return '***' for sensitive fields, otherwise the string representation."""
-    name_lower = field_name.lower()
-    if any(p in name_lower for p in SENSITIVE_PATTERNS):
+    if is_sensitive(field_name):
         return "***"
     return str(value)
 
 
+async def _log_pool_stats_periodically(interval: int):
+    """Log connection pool stats every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"DB pool stats: {get_pool_stats()}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
@@ -86,8 +106,29 @@ async def lifespan(app: FastAPI):
     for line in lines:
         logger.info(line)
 
+    pool_log_task = None
+    if settings.DB_POOL_LOG_INTERVAL > 0:
+        pool_log_task = asyncio.create_task(_log_pool_stats_periodically(settings.DB_POOL_LOG_INTERVAL))
+
+    # Keep the Clerk JWKS fresh off the request path
+    jwks_task = asyncio.create_task(run_jwks_refresh()) if settings.CLERK_JWKS_URL else None
+
+    replica_task = None
+    if replicas:
+        logger.info(f"Read replicas: {', '.join(r.address for r in replicas.replicas)}")
+        replica_task = asyncio.create_task(replicas.run_health_checks())
+
     yield
     logger.info("Shutting down API")
+    if pool_log_task:
+        pool_log_task.cancel()
+    if jwks_task:
+        jwks_task.cancel()
+    if replica_task:
+        replica_task.cancel()
+    logger.info(f"DB pool stats: {get_pool_stats()}")
+    await async_engine.dispose()
+    await replicas.dispose()
 
 
 # Create FastAPI app
@@ -100,20 +141,30 @@ app = FastAPI(
     redoc_url=f"{settings.API_PREFIX}/redoc",
 )
 
+# Statement timeouts (see query_limits.py) answer 400 instead of 500
+app.add_exception_handler(DBAPIError, statement_timeout_handler)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", READ_PRIMARY_HEADER],
+    expose_headers=[READ_PRIMARY_HEADER],  # Read-your-writes, see database.py
 )
 
+# Response compression (gzip/br/zstd from Accept-Encoding; SSE is never compressed)
+app.add_middleware(CompressionMiddleware)
+
 # Trust proxy headers (X-Forwarded-Proto, X-Forwarded-For) so redirects use HTTPS
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
-# Request logging middleware
-app.add_middleware(RequestLoggingMiddleware)
+# Request timing (Server-Timing header) and request logging
+app.add_middleware(
+    TimingMiddleware,
+    quiet_paths={"/health", "/metrics", "/", f"{settings.API_PREFIX}/docs", f"{settings.API_PREFIX}/redoc", f"{settings.API_PREFIX}/openapi.json"},
+)
 
 # Include routers
 app.include_router(tareas.router, prefix=settings.API_PREFIX)
@@ -142,14 +193,13 @@ def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_api_key)])
+def get_metrics():
+    """Metrics in the Prometheus text format, merged over the worker processes."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    import os
-    import uvicorn
-
-    port = int(os.environ.get("PORT", settings.API_PORT))
-    uvicorn.run(
-        "app.main:app",
-        host=settings.API_HOST,
-        port=port,
-        reload=True,
-    )
+    from app.server import run
+
+    run()
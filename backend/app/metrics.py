@@ -0,0 +1,158 @@
+"""
+Prometheus metrics (``GET /metrics``), recorded with ``prometheus_client``.
+
+Recording a value is a few additions under a lock, cheap enough for every
+request; the text is only built when scraped.
+
+With several workers, ``app/server.py`` sets ``PROMETHEUS_MULTIPROC_DIR``
+before the app (and ``prometheus_client``) is imported: every worker then
+records into its own files in that directory, and ``/metrics`` (served by any
+worker) reads them all with ``MultiProcessCollector``:
+
+- counters and histograms are summed over every worker, including those that
+  exited, so totals never go back when a worker is replaced;
+- gauges are combined over the live workers by their ``multiprocess_mode``:
+  ``livesum`` (in-flight requests, pool occupancy), ``livemin`` or
+  ``livemax``. Gunicorn's ``child_exit`` hook calls ``mark_process_dead`` so
+  an exited worker's gauges are dropped.
+
+The metrics themselves:
+
+- HTTP: latency histogram per method/route/status (route is the path
+  template, e.g. ``/api/v1/tareas/{tarea_id}``), in-flight requests and DB
+  queries per request (recorded by ``TimingMiddleware``),
+- connection pools: occupancy and checkout counters (recorded by the
+  instrumented pools of ``pool_metrics.py`` on every checkout and checkin),
+- query limits: statement timeouts and search cost rejections,
+- read replicas: health, replay lag and read sessions per target,
+- admission control: slots in use, queued and shed requests per route class,
+- agent: iterations per conversation, tool durations and Anthropic token
+  usage (recorded by the orchestrator).
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# A ``_created`` timestamp per counter and histogram series doubles the output for no use here
+disable_created_metrics()
+
+
+def render() -> bytes:
+    """All metrics in the text exposition format (over every worker with ``PROMETHEUS_MULTIPROC_DIR``)."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+# --- HTTP ---
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the end of the response body.",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled.",
+    ("method",),
+    multiprocess_mode="livesum",
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "SQL execution time per request.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+
+# --- Connection pools (recorded by pool_metrics.py) ---
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool size.", ("pool",), multiprocess_mode="livesum")
+DB_POOL_MAX_OVERFLOW = Gauge(
+    "db_pool_max_overflow", "Connections allowed beyond the pool size.", ("pool",), multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently in use.", ("pool",), multiprocess_mode="livesum")
+DB_POOL_CHECKED_IN = Gauge("db_pool_checked_in", "Idle connections in the pool.", ("pool",), multiprocess_mode="livesum")
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Successful connection checkouts.", ("pool",))
+DB_POOL_CHECKOUT_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that timed out.", ("pool",))
+DB_POOL_CHECKOUT_WAIT = Counter("db_pool_checkout_wait_seconds_total", "Time spent waiting for a connection.", ("pool",))
+
+DB_QUERIES_REJECTED = Counter(
+    "db_queries_rejected_total",
+    "Requests answered 400 by a query limit (statement_timeout, cost_ceiling).",
+    ("reason",),
+)
+
+# --- Read replicas ---
+
+DB_READ_SESSIONS = Counter("db_read_sessions_total", "Read-only sessions by target (primary or replica).", ("target",))
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy", "1 while the replica is in the read rotation (of every worker).", ("replica",), multiprocess_mode="livemin"
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replay lag at the last health check (highest over the workers).", ("replica",), multiprocess_mode="livemax"
+)
+
+# --- Admission control ---
+
+ADMISSION_IN_USE = Gauge(
+    "admission_in_use", "Requests holding a slot, per route class.", ("route_class",), multiprocess_mode="livesum"
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "Requests waiting for a slot, per route class.", ("route_class",), multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed by admission control (queue_full: 429, queue_timeout: 503).",
+    ("route_class", "reason"),
+)
+
+# --- Agent ---
+
+AGENT_ITERATIONS = Histogram(
+    "agent_iterations",
+    "Model calls per agent conversation turn.",
+    ("status",),
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+AGENT_TOOL_DURATION = Histogram(
+    "agent_tool_duration_seconds",
+    "Agent tool execution time.",
+    ("tool",),
+    buckets=LATENCY_BUCKETS,
+)
+AGENT_TOKENS = Counter(
+    "agent_tokens_total",
+    "Anthropic API tokens used by the agent.",
+    ("model", "type"),
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, db_queries: int, db_seconds: float) -> None:
+    """Record one finished HTTP request."""
+    HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(seconds)
+    HTTP_REQUEST_DB_QUERIES.labels(method, route).observe(db_queries)
+    HTTP_REQUEST_DB_DURATION.labels(method, route).observe(db_seconds)
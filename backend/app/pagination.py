@@ -0,0 +1,156 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is ordered by ``(order_by column, primary key)`` so the position of
+any row is unique. The cursor handed to clients is an opaque, URL-safe token
+that encodes the ordering and the sort key of the last row returned; the next
+page seeks past that key with an indexed range predicate instead of
+``OFFSET``, so deep pages cost the same as the first one.
+"""
+import base64
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Type
+
+from fastapi import HTTPException
+from sqlalchemy import and_, inspect, or_, tuple_
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _primary_key(model: Type[Base]):
+    return inspect(model).mapper.primary_key[0]
+
+
+def resolve_order_column(model: Type[Base], order_by: str | None):
+    """Return the mapped column for ``order_by`` or None if unset/invalid."""
+    if not order_by:
+        return None
+    column = inspect(model).columns.get(order_by)
+    if column is None:
+        logger.warning(f"Invalid order_by field: {order_by}")
+    return column
+
+
+def _sort_column(model: Type[Base], order_by: str | None):
+    """The non-primary-key sort column, or None when sorting by primary key only."""
+    column = resolve_order_column(model, order_by)
+    if column is None or column is _primary_key(model):
+        return None
+    return column
+
+
+def order_clauses(model: Type[Base], order_by: str | None, order_dir: str) -> list:
+    """ORDER BY clauses for a stable ``(column, primary key)`` ordering."""
+    pk = _primary_key(model)
+    column = _sort_column(model, order_by)
+    keys = [pk] if column is None else [column, pk]
+    if order_dir == "desc":
+        return [k.desc() for k in keys]
+    return [k.asc() for k in keys]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(column, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(model: Type[Base], row, order_by: str | None, order_dir: str) -> str:
+    """Build the opaque cursor pointing just after ``row``."""
+    pk = _primary_key(model)
+    column = _sort_column(model, order_by)
+    payload = {
+        "o": column.key if column is not None else None,
+        "d": order_dir,
+        "pk": _to_json(getattr(row, pk.key)),
+    }
+    if column is not None:
+        payload["v"] = _to_json(getattr(row, column.key))
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, dict) or "pk" not in payload:
+            raise ValueError("missing key")
+        return payload
+    except (ValueError, UnicodeError) as e:
+        logger.warning(f"Invalid cursor: {e}")
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_segments(model: Type[Base], cursor: str, order_by: str | None, order_dir: str) -> list:
+    """WHERE clauses selecting the rows that come after ``cursor``, in page order.
+
+    PostgreSQL sorts NULLs last in ascending order and first in descending
+    order, so nullable sort columns need a separate NULL segment. Each segment
+    is one index range on ``(column, primary key)`` and every row of a segment
+    sorts after those of the previous one; callers fetch them one after another
+    until the page is full. (An OR of the segments is equivalent, but the
+    planner cannot start an index scan at the cursor for it.)
+    """
+    payload = _decode_cursor(cursor)
+    pk = _primary_key(model)
+    column = _sort_column(model, order_by)
+    if payload.get("o") != (column.key if column is not None else None) or payload.get("d") != order_dir:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested ordering")
+
+    try:
+        last_pk = _from_json(pk, payload["pk"])
+        last_value = _from_json(column, payload.get("v")) if column is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    desc = order_dir == "desc"
+    if column is None:
+        return [pk < last_pk if desc else pk > last_pk]
+
+    if last_value is None:
+        if desc:
+            # NULLs come first: remaining NULL rows, then every non-NULL row
+            return [and_(column.is_(None), pk < last_pk), column.isnot(None)]
+        # NULLs come last: only the remaining NULL rows
+        return [and_(column.is_(None), pk > last_pk)]
+
+    after = tuple_(column, pk) < tuple_(last_value, last_pk) if desc else tuple_(column, pk) > tuple_(last_value, last_pk)
+    if column.nullable and not desc:
+        return [after, column.is_(None)]
+    return [after]
+
+
+def keyset_filter(model: Type[Base], cursor: str, order_by: str | None, order_dir: str):
+    """Single WHERE clause selecting the rows that come after ``cursor``.
+
+    Fine for orderings without a NULL segment (e.g. by primary key); otherwise
+    prefer fetching ``keyset_segments`` one by one.
+    """
+    return or_(*keyset_segments(model, cursor, order_by, order_dir))
+
+
+def split_page(rows: list, limit: int, model: Type[Base], order_by: str | None, order_dir: str) -> tuple[list, str | None]:
+    """Trim a ``limit + 1`` fetch to ``limit`` rows and compute ``next_cursor``.
+
+    ``next_cursor`` is None when there are no more rows.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(model, page[-1], order_by, order_dir)
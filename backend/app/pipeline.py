@@ -0,0 +1,80 @@
+"""
+Multi-statement write flows in as few round trips as the driver allows.
+
+``run_statements(db, statements)`` executes ``(statement, params)`` pairs in
+order inside the session's transaction and returns the rows of each as dicts:
+
+- with psycopg 3 (``DB_DRIVER=psycopg``) they are sent in one pipeline, all
+  statements before the first result is read, so the flow costs a single
+  round trip;
+- with asyncpg they are executed one after the other.
+
+The statements are meant to be module-level constants taking their values
+from ``bindparam()``s (see ``routers/tareas.py``), like the ``text()``
+queries elsewhere. The pipeline bypasses SQLAlchemy's compiled cache, so it
+keeps its own, keyed by statement object: compiling the statements of a flow
+on every call would cost more than the round trips it saves on a nearby
+database.
+
+Pipelined statements go through the driver connection, not SQLAlchemy's
+execution events: Server-Timing counts the pipeline as one ``db`` query and
+its statements do not reach the slow-query log. Driver errors are re-raised
+as SQLAlchemy ``DBAPIError`` subclasses, as for any other statement.
+"""
+import weakref
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Compiled
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import Executable
+
+from app.timing import timed
+
+_compiled: "weakref.WeakKeyDictionary[Executable, Compiled]" = weakref.WeakKeyDictionary()
+
+
+def _driver_sql(statement: Executable, params: dict, dialect) -> tuple[str, dict]:
+    """SQL string and driver parameters of ``statement``, expanding IN lists."""
+    compiled = _compiled.get(statement)
+    if compiled is None:
+        compiled = _compiled[statement] = statement.compile(dialect=dialect)
+    expanded = compiled.construct_expanded_state(compiled.construct_params(params))
+    parameters = {
+        name: expanded.processors[name](value) if name in expanded.processors else value
+        for name, value in expanded.parameters.items()
+    }
+    return expanded.statement, parameters
+
+
+async def run_statements(db: AsyncSession, statements: list[tuple[Executable, dict]]) -> list[list[dict]]:
+    """Run ``(statement, params)`` pairs in order; one list of row dicts per statement (empty without RETURNING)."""
+    conn = await db.connection()
+    if conn.dialect.driver != "psycopg":
+        results = []
+        for statement, params in statements:
+            result = await conn.execute(statement, params)
+            results.append([dict(row._mapping) for row in result] if result.returns_rows else [])
+        return results
+
+    import psycopg
+
+    queries = [_driver_sql(statement, params, conn.dialect) for statement, params in statements]
+    driver_conn = (await conn.get_raw_connection()).driver_connection
+    with timed("db"):
+        try:
+            cursors = []
+            async with driver_conn.pipeline():
+                for sql, parameters in queries:
+                    cursor = driver_conn.cursor()
+                    await cursor.execute(sql, parameters)
+                    cursors.append(cursor)
+            results = []
+            for cursor in cursors:
+                if cursor.description is None:
+                    results.append([])
+                    continue
+                names = [column.name for column in cursor.description]
+                results.append([dict(zip(names, row)) for row in await cursor.fetchall()])
+        except psycopg.Error as e:
+            raise exc.DBAPIError.instance(None, None, e, psycopg.Error) from e
+    return results
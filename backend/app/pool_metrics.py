@@ -0,0 +1,138 @@
+"""Connection pool instrumentation for the database engines.
+
+Wraps SQLAlchemy's queue pools so every checkout records how long the
+caller waited for a connection and whether it gave up with a timeout. The
+same events update the ``db_pool_*`` Prometheus metrics: checkout counters,
+and the pool occupancy after each checkout and checkin.
+"""
+
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metrics import (
+    DB_POOL_CHECKED_IN,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_TIMEOUTS,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_CHECKOUTS,
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+)
+
+LOG = logging.getLogger("task_manager_backend")
+
+
+class PoolMetrics:
+    """Thread-safe counters for connection checkouts on one pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._checkouts = DB_POOL_CHECKOUTS.labels(name)
+        self._timeouts = DB_POOL_CHECKOUT_TIMEOUTS.labels(name)
+        self._wait = DB_POOL_CHECKOUT_WAIT.labels(name)
+        self._occupancy = [
+            (DB_POOL_SIZE.labels(name), QueuePool.size),
+            (DB_POOL_MAX_OVERFLOW.labels(name), lambda pool: pool._max_overflow),
+            (DB_POOL_CHECKED_OUT.labels(name), QueuePool.checkedout),
+            (DB_POOL_CHECKED_IN.labels(name), QueuePool.checkedin),
+        ]
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+        self._checkouts.inc()
+        self._wait.inc(seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+        self._timeouts.inc()
+
+    def record_occupancy(self, pool: QueuePool) -> None:
+        """Set the occupancy gauges from ``pool`` (when created, after a checkout or checkin)."""
+        for gauge, read in self._occupancy:
+            gauge.set(read(pool))
+
+    def snapshot(self) -> dict:
+        """Return the counters as a plain dict (wait times in milliseconds)."""
+        with self._lock:
+            avg = self.wait_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "wait_avg_ms": round(avg * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+            }
+
+
+def instrumented_pool_class(base: type[QueuePool], metrics: PoolMetrics) -> type[QueuePool]:
+    """Build a pool class that reports checkout waits to ``metrics``.
+
+    A dedicated subclass is created per engine because SQLAlchemy recreates
+    pools (e.g. on ``dispose()``) via ``self.__class__``; keeping the metrics
+    on the class means they survive those recreations.
+    """
+
+    def __init__(self, *args, **kwargs):
+        base.__init__(self, *args, **kwargs)
+        self._metrics.record_occupancy(self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = base._do_get(self)
+        except exc.TimeoutError:
+            self._metrics.record_timeout()
+            LOG.warning(
+                "DB pool '%s' checkout timed out: %s",
+                self._metrics.name, pool_status(self),
+            )
+            raise
+        self._metrics.record_wait(time.perf_counter() - start)
+        self._metrics.record_occupancy(self)
+        return conn
+
+    def _do_return_conn(self, record):
+        base._do_return_conn(self, record)
+        self._metrics.record_occupancy(self)
+
+    return type(
+        f"Instrumented{base.__name__}",
+        (base,),
+        {"_metrics": metrics, "__init__": __init__, "_do_get": _do_get, "_do_return_conn": _do_return_conn},
+    )
+
+
+def pool_status(pool: QueuePool) -> dict:
+    """Current occupancy of a queue pool plus its checkout counters."""
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    metrics = getattr(pool, "_metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
+
+
+async_pool_metrics = PoolMetrics("async")
+sync_pool_metrics = PoolMetrics("sync")
+
+AsyncPoolClass = instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_metrics)
+SyncPoolClass = instrumented_pool_class(QueuePool, sync_pool_metrics)
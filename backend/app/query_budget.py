@@ -0,0 +1,68 @@
+"""
+Query budget helper for tests and scripts.
+
+``query_budget`` records every statement run on the backend engines while
+the block executes and fails if there were more than ``max_queries`` (or, with
+``max_repeats``, if one statement shape ran more often than that, the N+1
+pattern)::
+
+    with query_budget(3):
+        client.put("/api/v1/tareas/1", json={...}, headers=headers)
+
+It listens on the engines directly rather than the request context, so it
+also sees requests served by ``TestClient`` in another thread. Statements
+from unrelated concurrent work are counted too: use it on a quiet process.
+"""
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.database import all_engines
+from app.timing import statement_shape
+
+
+class QueryLog:
+    """Statements captured by ``query_budget``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements: list[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def shapes(self) -> Counter[str]:
+        """Executions per statement shape."""
+        return Counter(statement_shape(statement) for statement in self.statements)
+
+    def summary(self) -> str:
+        return "\n".join(f"  {count}x {shape[:200]}" for shape, count in self.shapes().most_common())
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int | None = None) -> Iterator[QueryLog]:
+    """Fail with AssertionError if the block exceeds the query budget."""
+    log = QueryLog()
+    engines = all_engines()
+    for target in engines:
+        event.listen(target, "after_cursor_execute", log._record)
+    try:
+        yield log
+    finally:
+        for target in engines:
+            event.remove(target, "after_cursor_execute", log._record)
+
+    if log.count > max_queries:
+        raise AssertionError(f"{log.count} queries, budget is {max_queries}:\n{log.summary()}")
+    if max_repeats is not None:
+        shape, count = next(iter(log.shapes().most_common(1)), ("", 0))
+        if count > max_repeats:
+            raise AssertionError(f"Statement repeated {count}x, limit is {max_repeats}: {shape[:200]}")
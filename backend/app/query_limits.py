@@ -0,0 +1,110 @@
+"""
+Statement timeouts and the search cost ceiling.
+
+Every statement of an API request runs under a ``statement_timeout``, so one
+pathological query cannot hold a connection (and a worker) indefinitely:
+
+- routes declare a route class with ``Depends(statement_timeout("search"))``
+  and get ``STATEMENT_TIMEOUTS[route_class]`` milliseconds,
+- every other session from ``get_db`` / ``get_read_db`` gets
+  ``DB_STATEMENT_TIMEOUT_MS``,
+- 0 disables the limit (export).
+
+``DB_STATEMENT_TIMEOUT_MS`` is the connection default of the async engines
+(``drivers.async_connect_args``), so the common case costs nothing per
+transaction. The DB dependencies put the request's timeout in a ContextVar,
+and an ``after_begin`` session event issues ``SET LOCAL statement_timeout``
+only when it differs from the connection's default (route classes, and any
+request session on the sync engines, which keep the server default); it
+covers every transaction of the request, including the ones started after a
+commit. Sessions outside a request run under the connection default
+(scripts and ``plan_check`` use the unlimited sync engine). A cancelled
+statement becomes a 400 through ``statement_timeout_handler`` instead of a 500.
+
+``check_search_cost`` enforces ``SEARCH_MAX_COST``: ``search()`` rejects,
+before running it, a statement whose planner cost (EXPLAIN, no ANALYZE) is
+above the ceiling; it costs the page query with its LIMIT and, for exact
+counts, the count query.
+"""
+import logging
+from contextvars import ContextVar
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_CANCELED = "57014"
+
+_timeout_ms: ContextVar[int | None] = ContextVar("statement_timeout_ms", default=None)
+
+
+def statement_timeout(route_class: str):
+    """Dependency that sets the statement timeout of ``route_class`` for the request."""
+
+    async def apply(request: Request) -> None:
+        request.state.statement_timeout_ms = settings.STATEMENT_TIMEOUTS.get(
+            route_class, settings.DB_STATEMENT_TIMEOUT_MS
+        )
+        _timeout_ms.set(request.state.statement_timeout_ms)
+
+    return apply
+
+
+def use_statement_timeout(request: Request) -> None:
+    """Apply the route's statement timeout, or ``DB_STATEMENT_TIMEOUT_MS``, to the request's sessions."""
+    _timeout_ms.set(getattr(request.state, "statement_timeout_ms", settings.DB_STATEMENT_TIMEOUT_MS))
+
+
+def _connection_default_ms(connection) -> int | None:
+    # The async engines connect with DB_STATEMENT_TIMEOUT_MS; the sync ones keep the server's default
+    return settings.DB_STATEMENT_TIMEOUT_MS if connection.dialect.is_async else None
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection) -> None:
+    timeout_ms = _timeout_ms.get()
+    if timeout_ms is not None and timeout_ms != _connection_default_ms(connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def is_statement_timeout(error: DBAPIError) -> bool:
+    """Whether ``error`` is PostgreSQL cancelling a statement for ``statement_timeout``."""
+    orig = error.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return code == QUERY_CANCELED and "statement timeout" in str(orig)
+
+
+async def statement_timeout_handler(request: Request, exc: DBAPIError):
+    """Exception handler: statement timeouts become 400, other database errors are re-raised."""
+    if not is_statement_timeout(exc):
+        raise exc
+    limit = f"{_timeout_ms.get()} ms" if _timeout_ms.get() is not None else "server"
+    metrics.DB_QUERIES_REJECTED.labels("statement_timeout").inc()
+    logger.warning(f"Statement timeout ({limit}) on {request.method} {request.url.path}")
+    return JSONResponse(
+        status_code=400,
+        content={"detail": f"Query cancelled by the {limit} statement timeout; use more selective filters"},
+    )
+
+
+def check_search_cost(plan: dict, table_name: str) -> None:
+    """Raise 400 if the EXPLAIN ``plan`` of a search exceeds ``SEARCH_MAX_COST``."""
+    cost = plan["Total Cost"]
+    if cost <= settings.SEARCH_MAX_COST:
+        return
+    metrics.DB_QUERIES_REJECTED.labels("cost_ceiling").inc()
+    logger.warning(f"Search on {table_name} rejected: estimated cost {cost:.1f} > {settings.SEARCH_MAX_COST:g}")
+    raise HTTPException(
+        status_code=400,
+        detail=(
+            f"Search too expensive (estimated cost {cost:.1f}, limit {settings.SEARCH_MAX_COST:g}); "
+            "use more selective filters"
+        ),
+    )
@@ -0,0 +1,149 @@
+"""
+Read replicas.
+
+``DB_REPLICA_DSNS`` lists PostgreSQL streaming replicas of the primary. Each
+gets its own async and sync engines (same pool options and instrumentation as
+the primary's, see ``app/database.py``). Read-only endpoints take their
+session from ``database.get_read_db``, which picks the healthy replicas in
+round-robin order; writes always go to the primary through ``get_db``.
+
+A replica leaves the rotation when:
+
+- its health check (every ``DB_REPLICA_HEALTH_INTERVAL`` seconds) fails or
+  reports more than ``DB_REPLICA_MAX_LAG`` seconds of replay lag,
+- a request cannot connect to it (that request falls back to the primary),
+
+and comes back at the first health check that passes. With no healthy
+replica, reads are served by the primary.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import time
+
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import metrics
+from app.config import settings
+from app.drivers import SYNC_DRIVERNAME, async_connect_args, async_drivername
+from app.pool_metrics import PoolMetrics, instrumented_pool_class
+
+logger = logging.getLogger(__name__)
+
+# Replay lag in seconds; 0 when everything received has been replayed (an idle
+# primary would otherwise look like growing lag), NULL on a server that is not
+# a standby.
+LAG_SQL = text(
+    "SELECT pg_is_in_recovery(), "
+    "CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    """One read replica: its engines and last known health."""
+
+    def __init__(self, name: str, dsn: str, pool_options: dict):
+        url = make_url(dsn)
+        self.name = name
+        self.address = f"{url.host}:{url.port or 5432}"
+        self.healthy = True
+        self.in_recovery: bool | None = None
+        self.lag: float | None = None
+        self.error: str | None = None
+        self.checked_at: float | None = None
+
+        self.async_engine: AsyncEngine = create_async_engine(
+            url.set(drivername=async_drivername()),
+            echo=settings.DATABASE_ECHO,
+            poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, PoolMetrics(f"{name}-async")),
+            connect_args=async_connect_args(settings.DB_REPLICA_CONNECT_TIMEOUT),
+            **pool_options,
+        )
+        self.engine: Engine = create_engine(
+            url.set(drivername=SYNC_DRIVERNAME),
+            echo=settings.DATABASE_ECHO,
+            poolclass=instrumented_pool_class(QueuePool, PoolMetrics(f"{name}-sync")),
+            connect_args={"connect_timeout": max(1, math.ceil(settings.DB_REPLICA_CONNECT_TIMEOUT))},
+            **pool_options,
+        )
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "address": self.address,
+            "healthy": self.healthy,
+            "in_recovery": self.in_recovery,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_at": self.checked_at,
+        }
+
+
+class ReplicaSet:
+    """Round-robin choice among the healthy replicas."""
+
+    def __init__(self, dsns: list[str], pool_options: dict):
+        self.replicas = [Replica(f"replica{i}", dsn, pool_options) for i, dsn in enumerate(dsns)]
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def pick(self) -> Replica | None:
+        """Next healthy replica, or None when reads should use the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_down(self, replica: Replica, error: str) -> None:
+        """Take ``replica`` out of the rotation until its next passing health check."""
+        replica.error = error
+        metrics.DB_REPLICA_HEALTHY.labels(replica.name).set(0)
+        if replica.healthy:
+            replica.healthy = False
+            logger.warning(f"Read replica {replica.name} ({replica.address}) out of rotation: {error}")
+
+    def _mark_up(self, replica: Replica) -> None:
+        replica.error = None
+        metrics.DB_REPLICA_HEALTHY.labels(replica.name).set(1)
+        if not replica.healthy:
+            replica.healthy = True
+            logger.info(f"Read replica {replica.name} ({replica.address}) back in rotation")
+
+    async def check(self, replica: Replica) -> None:
+        """Connect to ``replica`` and update its health from the replay lag."""
+        replica.checked_at = time.time()
+        try:
+            async with asyncio.timeout(settings.DB_REPLICA_CONNECT_TIMEOUT * 2):
+                async with replica.async_engine.connect() as conn:
+                    replica.in_recovery, lag = (await conn.execute(LAG_SQL)).one()
+        except Exception as e:
+            self.mark_down(replica, str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__)
+            return
+
+        replica.lag = float(lag) if lag is not None else None
+        metrics.DB_REPLICA_LAG.labels(replica.name).set(replica.lag or 0)
+        if replica.lag is not None and replica.lag > settings.DB_REPLICA_MAX_LAG:
+            self.mark_down(replica, f"replay lag {replica.lag:.1f}s exceeds {settings.DB_REPLICA_MAX_LAG}s")
+        else:
+            self._mark_up(replica)
+
+    async def run_health_checks(self) -> None:
+        """Background task: check every replica each ``DB_REPLICA_HEALTH_INTERVAL`` seconds."""
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL)
+
+    def status(self) -> list[dict]:
+        return [replica.status() for replica in self.replicas]
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.async_engine.dispose()
+            replica.engine.dispose()
@@ -0,0 +1,358 @@
+"""
+Bulk restore of an ``/admin/export`` file with ``COPY FROM STDIN``.
+
+Accepts every export format (json, ndjson, csv zip, parquet zip) and
+compression (gzip/zstd for json and ndjson). The whole restore runs in one
+transaction that replaces the content of the restored tables:
+
+1. TRUNCATE the tables (RESTART IDENTITY).
+2. Drop their foreign keys and secondary indexes, disable user triggers
+   (``fecha_siguiente_accion`` is part of the export, nothing to recompute).
+3. COPY each table in file order (the export writes them in dependency order).
+4. Recreate the indexes, re-add and validate the foreign keys in one pass per
+   table, re-enable the triggers, move the sequences past the restored ids
+   and ANALYZE.
+
+Any error rolls everything back, leaving the database as it was.
+
+Only the standard library and psycopg2 are imported at module level (pyarrow
+and zstandard are loaded on demand): ``manage.py restore`` loads this file
+directly (``management/src/restore/db_restore.py``), without the ``app``
+package, so keep it free of ``app`` imports.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import re
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+import psycopg2
+from psycopg2 import sql
+
+LOG = logging.getLogger("task_manager_backend")
+
+# Rows per chunk handed to COPY
+RESTORE_BATCH_SIZE = 1000
+
+METADATA_FILENAME = "export_metadata.json"
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+_NEEDS_ESCAPE = re.compile(r"[\\\n\r\t]")
+
+
+class RestoreError(ValueError):
+    """The file cannot be restored (bad format, unknown table or column, bad data)."""
+
+
+def detect_format(filename: str) -> tuple[str, str | None]:
+    """``(format, compression)`` from an export file name, e.g. ``x.ndjson.zst``."""
+    name = filename.lower()
+    compression = None
+    if name.endswith(".gz"):
+        compression, name = "gzip", name[:-3]
+    elif name.endswith(".zst"):
+        compression, name = "zstd", name[:-4]
+    for suffix, fmt in ((".csv.zip", "csv"), (".parquet.zip", "parquet"), (".ndjson", "ndjson"), (".json", "json")):
+        if name.endswith(suffix):
+            return fmt, compression
+    raise RestoreError(f"Cannot tell the export format of '{filename}'")
+
+
+# --- Readers: each yields (table, columns, copy_format, chunks of COPY data) ---
+
+def _copy_text(value) -> str:
+    """One value in COPY text format."""
+    if value is None:
+        return "\\N"
+    if type(value) is not str:
+        return str(value)
+    # Most values need no escaping; searching is much cheaper than translating
+    if _NEEDS_ESCAPE.search(value):
+        return value.translate(_COPY_ESCAPES)
+    return value
+
+
+def _copy_rows(rows: Iterable[list]) -> Iterator[bytes]:
+    """COPY text format, ``RESTORE_BATCH_SIZE`` rows per chunk."""
+    lines = []
+    for row in rows:
+        lines.append("\t".join(_copy_text(value) for value in row) + "\n")
+        if len(lines) >= RESTORE_BATCH_SIZE:
+            yield "".join(lines).encode()
+            lines.clear()
+    if lines:
+        yield "".join(lines).encode()
+
+
+def _dict_tables(records: Iterator[tuple[str, dict]]):
+    """Group consecutive ``(table, row dict)`` records into one COPY per table.
+
+    Each table's rows must be consumed before asking for the next table.
+    """
+    following = None
+
+    def rows(table, columns, first):
+        nonlocal following
+        yield [first.get(c) for c in columns]
+        for record_table, row in records:
+            if record_table != table:
+                following = (record_table, row)
+                return
+            yield [row.get(c) for c in columns]
+
+    record = next(records, None)
+    while record is not None:
+        table, first = record
+        following = None
+        yield table, list(first), "text", _copy_rows(rows(table, list(first), first))
+        record = following
+
+
+def _json_tables(stream: BinaryIO):
+    # A single JSON document cannot be parsed incrementally with the standard
+    # library; prefer ndjson/csv/parquet for large restores.
+    try:
+        document = json.load(stream)
+        data = document["data"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise RestoreError(f"Invalid json export: {e}")
+    for table, rows in data.items():
+        if rows:
+            columns = list(rows[0])
+            yield table, columns, "text", _copy_rows([row.get(c) for c in columns] for row in rows)
+
+
+def _ndjson_tables(stream: BinaryIO):
+    def records():
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise RestoreError(f"Invalid ndjson line {number}: {e}")
+            if "export_metadata" in record:
+                continue
+            try:
+                yield record["table"], record["data"]
+            except (KeyError, TypeError):
+                raise RestoreError(f"ndjson line {number} has no table/data")
+
+    yield from _dict_tables(records())
+
+
+def _zip_members(archive: zipfile.ZipFile, extension: str) -> list[tuple[str, str]]:
+    members = []
+    for name in archive.namelist():
+        if name == METADATA_FILENAME:
+            continue
+        if not name.endswith(extension):
+            raise RestoreError(f"Unexpected file in export archive: {name}")
+        members.append((name[: -len(extension)], name))
+    return members
+
+
+def _csv_tables(stream: BinaryIO):
+    # The CSV members are passed to COPY (FORMAT csv) as they are: the export
+    # quotes every value but NULL, which is what COPY expects.
+    archive = zipfile.ZipFile(stream)
+    for table, name in _zip_members(archive, ".csv"):
+        member = archive.open(name)
+        header = member.readline().decode("utf-8")
+        columns = next(csv.reader([header]), [])
+        yield table, columns, "csv", iter(lambda: member.read(1 << 16), b"")
+
+
+def _parquet_tables(stream: BinaryIO):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    # pyarrow writes CSV in C with strings quoted and nulls as empty cells,
+    # which is what COPY (FORMAT csv) expects; much faster than Python rows.
+    options = pa_csv.WriteOptions(include_header=False)
+
+    def chunks(parquet):
+        for batch in parquet.iter_batches(batch_size=RESTORE_BATCH_SIZE * 10):
+            buffer = pa.BufferOutputStream()
+            pa_csv.write_csv(batch, buffer, options)
+            yield buffer.getvalue().to_pybytes()
+
+    archive = zipfile.ZipFile(stream)
+    for table, name in _zip_members(archive, ".parquet"):
+        parquet = pq.ParquetFile(archive.open(name))
+        yield table, parquet.schema_arrow.names, "csv", chunks(parquet)
+
+
+_READERS = {"json": _json_tables, "ndjson": _ndjson_tables, "csv": _csv_tables, "parquet": _parquet_tables}
+
+
+def _decompressed(stream: BinaryIO, compression: str | None) -> BinaryIO:
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == "zstd":
+        import zstandard
+
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stream))
+    return stream
+
+
+class _ChunkReader(io.RawIOBase):
+    """File-like view of an iterator of bytes, for ``copy_expert``."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                self._buffer = b""
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+# --- Loader ---
+
+def _fetch(cursor, query: str, tables: list[str]) -> list[tuple]:
+    cursor.execute(query, (tables,))
+    return cursor.fetchall()
+
+
+def _table_columns(cursor, tables: list[str]) -> dict[str, set[str]]:
+    columns = {}
+    for table, column in _fetch(
+        cursor,
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = 'public' AND table_name = ANY(%s)",
+        tables,
+    ):
+        columns.setdefault(table, set()).add(column)
+    return columns
+
+
+def _drop_foreign_keys(cursor, tables: list[str]) -> list[tuple[str, str, str]]:
+    foreign_keys = _fetch(
+        cursor,
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE contype = 'f' AND connamespace = 'public'::regnamespace AND conrelid::regclass::text = ANY(%s)",
+        tables,
+    )
+    for table, name, _ in foreign_keys:
+        cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.Identifier(table), sql.Identifier(name)))
+    return foreign_keys
+
+
+def _drop_secondary_indexes(cursor, tables: list[str]) -> list[tuple[str, str]]:
+    """Drop indexes that do not back a constraint (primary key, unique)."""
+    indexes = _fetch(
+        cursor,
+        "SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "WHERE i.indrelid::regclass::text = ANY(%s) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+        tables,
+    )
+    for name, _ in indexes:
+        cursor.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(name)))
+    return indexes
+
+
+def _reset_sequences(cursor, tables: list[str]) -> None:
+    """Move each serial sequence past the highest restored id."""
+    for table, column, sequence in _fetch(
+        cursor,
+        "SELECT table_name, column_name, pg_get_serial_sequence(table_name, column_name) "
+        "FROM information_schema.columns WHERE table_schema = 'public' AND table_name = ANY(%s) "
+        "AND pg_get_serial_sequence(table_name, column_name) IS NOT NULL",
+        tables,
+    ):
+        cursor.execute(
+            sql.SQL("SELECT setval(%s, COALESCE(MAX({}), 0) + 1, false) FROM {}").format(
+                sql.Identifier(column), sql.Identifier(table)
+            ),
+            (sequence,),
+        )
+
+
+def restore(conn, stream: BinaryIO, fmt: str, compression: str | None, tables: list[str]) -> dict[str, int]:
+    """Replace ``tables`` with the content of an export file; returns rows per table.
+
+    ``conn`` is a psycopg2 connection; the restore is committed on success and
+    rolled back on any error. Tables of ``tables`` missing from the file end up
+    empty. ``stream`` must be seekable for the zip formats (csv, parquet).
+    """
+    if fmt not in _READERS:
+        raise RestoreError(f"Unknown export format: {fmt}")
+    start = time.time()
+    record_counts = {}
+    identifiers = sql.SQL(", ").join(sql.Identifier(t) for t in tables)
+    try:
+        with conn.cursor() as cursor:
+            table_columns = _table_columns(cursor, tables)
+            missing = [t for t in tables if t not in table_columns]
+            if missing:
+                raise RestoreError(f"Table(s) not in the database: {', '.join(missing)}")
+
+            cursor.execute("SET LOCAL maintenance_work_mem = '256MB'")
+            cursor.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY").format(identifiers))
+            foreign_keys = _drop_foreign_keys(cursor, tables)
+            indexes = _drop_secondary_indexes(cursor, tables)
+            for table in tables:
+                cursor.execute(sql.SQL("ALTER TABLE {} DISABLE TRIGGER USER").format(sql.Identifier(table)))
+
+            # For parquet the compression is the column codec, handled by pyarrow
+            source = stream if fmt == "parquet" else _decompressed(stream, compression)
+            for table, columns, copy_format, chunks in _READERS[fmt](source):
+                if table not in table_columns:
+                    raise RestoreError(f"Unknown table in export: {table}")
+                if table in record_counts:
+                    raise RestoreError(f"Table '{table}' appears twice in the export")
+                unknown = [c for c in columns if c not in table_columns[table]]
+                if unknown:
+                    raise RestoreError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+                copy = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT {}, FREEZE)").format(
+                    sql.Identifier(table),
+                    sql.SQL(", ").join(sql.Identifier(c) for c in columns),
+                    sql.SQL(copy_format),
+                )
+                cursor.copy_expert(copy, _ChunkReader(chunks), size=1 << 16)
+                record_counts[table] = cursor.rowcount
+                LOG.info(f"Restored {cursor.rowcount} rows into {table}")
+
+            for _, definition in indexes:
+                cursor.execute(definition)
+            for table, name, definition in foreign_keys:
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(sql.Identifier(table), sql.Identifier(name))
+                    + sql.SQL(definition)
+                )
+            for table in tables:
+                cursor.execute(sql.SQL("ALTER TABLE {} ENABLE TRIGGER USER").format(sql.Identifier(table)))
+            _reset_sequences(cursor, tables)
+            cursor.execute(sql.SQL("ANALYZE {}").format(identifiers))
+        conn.commit()
+    except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+        conn.rollback()
+        raise RestoreError(str(e).strip())
+    except (zipfile.BadZipFile, OSError, EOFError) as e:
+        conn.rollback()
+        raise RestoreError(f"Unreadable export file: {e}")
+    except Exception:
+        conn.rollback()
+        raise
+
+    total = sum(record_counts.values())
+    LOG.info(f"Restore completed in {time.time() - start:.1f}s: {record_counts} (total: {total})")
+    return record_counts
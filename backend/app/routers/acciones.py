@@ -4,162 +4,211 @@ import logging
 from datetime import date, datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import Date, DateTime, Integer, Text, bindparam, exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import verify_auth
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import AccionRealizada, Tarea
-from app.schemas import AccionCreate, AccionUpdate, CompleteAndScheduleRequest
-from app.crud import CRUDBase, model_to_dict
+from app.schemas import AccionCreate, AccionUpdate, AccionesByTareasRequest, CompleteAndScheduleRequest
+from app.crud import CRUDBase, model_to_dict, parse_fields_param
+from app.acciones_batch import MAX_BATCH_TAREA_IDS, load_acciones_by_tarea
+from app.pipeline import run_statements
+from app.timing import TimedRoute
 
 LOG = logging.getLogger("task_manager_backend")
 
-router = APIRouter(prefix="/acciones", tags=["acciones"], dependencies=[Depends(verify_auth)])
+router = APIRouter(prefix="/acciones", tags=["acciones"], dependencies=[Depends(verify_auth)], route_class=TimedRoute)
 crud_acciones = CRUDBase(AccionRealizada)
 
-
-def _sync_fecha_siguiente_accion(db: Session, tarea_id: int) -> Tarea | None:
-    """Recalculate and update the tarea's fecha_siguiente_accion
-    based on the min fecha_accion of pending acciones (case-insensitive)."""
-    min_fecha = (
-        db.query(func.min(AccionRealizada.fecha_accion))
-        .filter(
-            AccionRealizada.tarea_id == tarea_id,
-            func.lower(AccionRealizada.estado) == "pendiente",
+# Statements of POST /complete-and-schedule, run through pipeline.run_statements
+_COMPLETE_ACCION = (
+    update(AccionRealizada)
+    .where(
+        AccionRealizada.id == bindparam("id_accion", type_=Integer),
+        AccionRealizada.tarea_id == bindparam("id_tarea", type_=Integer),
+    )
+    .values(
+        accion=bindparam("texto", type_=Text),
+        fecha_accion=bindparam("fecha", type_=Date),
+        estado="Completada",
+        fecha_actualizacion=bindparam("now", type_=DateTime),
+    )
+    .returning(*AccionRealizada.__table__.columns)
+)
+
+
+def _insert_accion(*conditions):
+    # INSERT ... SELECT from the tarea row: nothing is inserted if it does not exist
+    return (
+        insert(AccionRealizada)
+        .from_select(
+            ["tarea_id", "accion", "fecha_accion", "estado"],
+            select(
+                Tarea.tarea_id,
+                bindparam("texto", type_=Text),
+                bindparam("fecha", type_=Date),
+                bindparam("estado_accion", type_=Text),
+            ).where(Tarea.tarea_id == bindparam("id_tarea", type_=Integer), *conditions),
         )
-        .scalar()
+        .returning(*AccionRealizada.__table__.columns)
     )
 
-    tarea = db.query(Tarea).filter(Tarea.tarea_id == tarea_id).first()
-    if tarea:
-        old_fecha = tarea.fecha_siguiente_accion
-        tarea.fecha_siguiente_accion = min_fecha
-        tarea.fecha_actualizacion = datetime.now()
-        db.commit()
-        db.refresh(tarea)
-        LOG.info(
-            f"Synced fecha_siguiente_accion for tarea {tarea_id}: "
-            f"{old_fecha} -> {min_fecha}"
-        )
-    return tarea
+
+_INSERT_ACCION = _insert_accion()
+# The next accion after completing an existing one: only inserted when that
+# accion belongs to the tarea, so a rejected request has written nothing
+_SCHEDULE_AFTER_ACCION = _insert_accion(
+    exists().where(
+        AccionRealizada.id == bindparam("id_accion", type_=Integer),
+        AccionRealizada.tarea_id == Tarea.tarea_id,
+    )
+)
+_SELECT_TAREA = select(*Tarea.__table__.columns).where(Tarea.tarea_id == bindparam("id_tarea", type_=Integer))
 
 
 @router.post("/complete-and-schedule", status_code=201)
-def complete_and_schedule(req: CompleteAndScheduleRequest, db: Session = Depends(get_db)):
-    """Complete a current action and schedule the next one atomically."""
-    tarea = db.query(Tarea).filter(Tarea.tarea_id == req.tarea_id).first()
-    if not tarea:
-        raise HTTPException(status_code=404, detail=f"Tarea {req.tarea_id} no encontrada")
-
+async def complete_and_schedule(req: CompleteAndScheduleRequest, db: AsyncSession = Depends(get_db)):
+    """Complete a current action and schedule the next one atomically.
+
+    The tarea's fecha_siguiente_accion is maintained by database triggers.
+    The writes and the final read of the tarea run as one batch of statements
+    (a single pipeline with psycopg, see ``pipeline.run_statements``), so the
+    existence checks come from the RETURNING rows instead of prior reads.
+    Every write is conditioned on the rows it depends on (the tarea, the
+    accion to complete), so none of them writes anything when the request is
+    rejected; the transaction is still rolled back before raising.
+    """
+    today = date.today()
     if req.accion_existente_id:
-        accion1 = db.query(AccionRealizada).filter(AccionRealizada.id == req.accion_existente_id).first()
-        if not accion1 or accion1.tarea_id != req.tarea_id:
-            raise HTTPException(status_code=400, detail="Accion no encontrada o no pertenece a la tarea")
-        accion1.accion = req.accion_completada
-        accion1.fecha_accion = date.today()
-        accion1.estado = "Completada"
-        accion1.fecha_actualizacion = datetime.now()
+        completar = (_COMPLETE_ACCION, {
+            "id_accion": req.accion_existente_id,
+            "id_tarea": req.tarea_id,
+            "texto": req.accion_completada,
+            "fecha": today,
+            "now": datetime.now(),
+        })
     else:
-        accion1 = AccionRealizada(
-            tarea_id=req.tarea_id,
-            accion=req.accion_completada,
-            fecha_accion=date.today(),
-            estado="Completada",
-        )
-        db.add(accion1)
-
-    accion2 = None
+        completar = (_INSERT_ACCION, {
+            "id_tarea": req.tarea_id, "texto": req.accion_completada, "fecha": today, "estado_accion": "Completada",
+        })
+    statements = [completar]
     if req.accion_siguiente:
-        accion2 = AccionRealizada(
-            tarea_id=req.tarea_id,
-            accion=req.accion_siguiente,
-            fecha_accion=req.fecha_siguiente,
-            estado="Pendiente",
-        )
-        db.add(accion2)
-
-    db.commit()
-    db.refresh(accion1)
-    if accion2:
-        db.refresh(accion2)
-
-    tarea = _sync_fecha_siguiente_accion(db, req.tarea_id)
+        siguiente = {
+            "id_tarea": req.tarea_id, "texto": req.accion_siguiente, "fecha": req.fecha_siguiente, "estado_accion": "Pendiente",
+        }
+        if req.accion_existente_id:
+            statements.append((_SCHEDULE_AFTER_ACCION, {**siguiente, "id_accion": req.accion_existente_id}))
+        else:
+            statements.append((_INSERT_ACCION, siguiente))
+    # Read last, after the acciones triggers updated fecha_siguiente_accion
+    statements.append((_SELECT_TAREA, {"id_tarea": req.tarea_id}))
+
+    results = await run_statements(db, statements)
+    tarea_rows = results[-1]
+    if not tarea_rows:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail=f"Tarea {req.tarea_id} no encontrada")
+    if not results[0]:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Accion no encontrada o no pertenece a la tarea")
+    await db.commit()
 
+    accion1 = results[0][0]
+    accion2 = results[1][0] if req.accion_siguiente else None
     if accion2:
-        LOG.info(f"Complete & schedule for tarea {req.tarea_id}: completed accion {accion1.id}, scheduled accion {accion2.id}")
+        LOG.info(f"Complete & schedule for tarea {req.tarea_id}: completed accion {accion1['id']}, scheduled accion {accion2['id']}")
     else:
-        LOG.info(f"Complete for tarea {req.tarea_id}: completed accion {accion1.id}")
+        LOG.info(f"Complete for tarea {req.tarea_id}: completed accion {accion1['id']}")
 
     result = {
-        "accion_completada": model_to_dict(accion1),
-        "tarea": model_to_dict(tarea),
+        "accion_completada": accion1,
+        "tarea": tarea_rows[0],
     }
     if accion2:
-        result["accion_siguiente"] = model_to_dict(accion2)
+        result["accion_siguiente"] = accion2
     return result
 
 
 @router.get("/tarea/{tarea_id}")
-def get_acciones_by_tarea(tarea_id: int, db: Session = Depends(get_db)):
+async def get_acciones_by_tarea(tarea_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get all acciones for a specific tarea."""
-    items = db.query(AccionRealizada).filter(AccionRealizada.tarea_id == tarea_id).all()
+    result = await db.execute(select(AccionRealizada).where(AccionRealizada.tarea_id == tarea_id))
+    items = result.scalars().all()
     return [model_to_dict(item) for item in items]
 
 
+@router.post("/by-tareas")
+async def get_acciones_by_tareas(req: AccionesByTareasRequest, db: AsyncSession = Depends(get_read_db)):
+    """Get the acciones of many tareas in one query, grouped by tarea_id."""
+    if not req.tarea_ids:
+        raise HTTPException(status_code=400, detail="tarea_ids must not be empty")
+    if len(req.tarea_ids) > MAX_BATCH_TAREA_IDS:
+        raise HTTPException(status_code=400, detail=f"tarea_ids admits at most {MAX_BATCH_TAREA_IDS} ids")
+
+    grouped = await load_acciones_by_tarea(
+        db,
+        req.tarea_ids,
+        estados=req.estados,
+        fecha_desde=req.fecha_desde,
+        fecha_hasta=req.fecha_hasta,
+    )
+    total = sum(len(items) for items in grouped.values())
+    LOG.info(f"Acciones by tareas: {len(grouped)} tareas, {total} acciones")
+    return {"total": total, "data": grouped}
+
+
 @router.get("/")
-def list_acciones(
+async def list_acciones(
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None, description="next_cursor from a previous page (keyset paging)"),
+    fields: str | None = Query(None, description="Comma-separated columns to return (primary key always included)"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List all acciones with pagination."""
-    total = crud_acciones.count(db)
-    items = crud_acciones.get_multi(db, skip=offset, limit=limit)
+    """List all acciones with offset or cursor pagination."""
+    total = await crud_acciones.count(db)
+    items, next_cursor = await crud_acciones.get_page(
+        db, limit=limit, skip=offset, cursor=cursor, fields=parse_fields_param(fields)
+    )
     return {
         "total": total,
-        "data": [model_to_dict(item) for item in items],
+        "data": items,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
     }
 
 
 @router.get("/{id}")
-def get_accion(id: int, db: Session = Depends(get_db)):
+async def get_accion(id: int, db: AsyncSession = Depends(get_read_db)):
     """Get an accion by ID."""
-    item = crud_acciones.get(db, id)
+    item = await crud_acciones.get(db, id)
     if not item:
         raise HTTPException(status_code=404, detail=f"Accion {id} no encontrada")
     return model_to_dict(item)
 
 
 @router.post("/", status_code=201)
-def create_accion(accion_in: AccionCreate, db: Session = Depends(get_db)):
-    """Create a new accion and sync tarea's fecha_siguiente_accion."""
-    item = crud_acciones.create(db, accion_in.model_dump())
-    _sync_fecha_siguiente_accion(db, accion_in.tarea_id)
+async def create_accion(accion_in: AccionCreate, db: AsyncSession = Depends(get_db)):
+    """Create a new accion (triggers keep tarea's fecha_siguiente_accion in sync)."""
+    item = await crud_acciones.create(db, accion_in.model_dump())
     return model_to_dict(item)
 
 
 @router.put("/{id}")
-def update_accion(id: int, accion_in: AccionUpdate, db: Session = Depends(get_db)):
-    """Update an accion and sync tarea's fecha_siguiente_accion."""
-    item = crud_acciones.get(db, id)
+async def update_accion(id: int, accion_in: AccionUpdate, db: AsyncSession = Depends(get_db)):
+    """Update an accion (triggers keep tarea's fecha_siguiente_accion in sync)."""
+    item = await crud_acciones.get(db, id)
     if not item:
         raise HTTPException(status_code=404, detail=f"Accion {id} no encontrada")
-    tarea_id = item.tarea_id
-    updated = crud_acciones.update(db, item, accion_in.model_dump(exclude_unset=True))
-    _sync_fecha_siguiente_accion(db, tarea_id)
+    updated = await crud_acciones.update(db, item, accion_in.model_dump(exclude_unset=True))
     return model_to_dict(updated)
 
 
 @router.delete("/{id}")
-def delete_accion(id: int, db: Session = Depends(get_db)):
-    """Delete an accion and sync tarea's fecha_siguiente_accion."""
-    item = crud_acciones.get(db, id)
-    if not item:
+async def delete_accion(id: int, db: AsyncSession = Depends(get_db)):
+    """Delete an accion (triggers keep tarea's fecha_siguiente_accion in sync)."""
+    if not await crud_acciones.delete(db, id):
         raise HTTPException(status_code=404, detail=f"Accion {id} no encontrada")
-    tarea_id = item.tarea_id
-    crud_acciones.delete(db, id)
-    _sync_fecha_siguiente_accion(db, tarea_id)
     return {"detail": f"Accion {id} eliminada"}
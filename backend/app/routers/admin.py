@@ -1,74 +1,127 @@
-"""Admin endpoints for database export."""
+"""Admin endpoints for database export/import and diagnostics."""
 
 import logging
-from datetime import date, datetime, timezone
+import tempfile
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from app.admission import admission
 from app.auth import verify_auth
-from app.database import get_db
-from app.models import EstadoTarea, EstadoAccion, Responsable, Tarea, AccionRealizada
-from app.crud import model_to_dict
+from app.config import settings
+from app.database import engine, get_pool_stats, mark_primary_reads, replicas
+from app.export import (
+    EXPORT_TABLES,
+    ExportCompression,
+    ExportError,
+    ExportFormat,
+    check_export_options,
+    export_filename,
+    export_media_type,
+    stream_export,
+)
+from app.query_limits import statement_timeout
+from app.restore import RestoreError, restore
+from app.slow_queries import recent_slow_queries, slow_query_summary
+from app.timing import TimedRoute
 
 LOG = logging.getLogger("task_manager_backend")
 
-router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(verify_auth)])
-
-# Tables in dependency order: reference tables first, then main, then dependent
-EXPORT_TABLES = [
-    ("estados_tareas", EstadoTarea),
-    ("estados_acciones", EstadoAccion),
-    ("responsables", Responsable),
-    ("tareas", Tarea),
-    ("acciones_realizadas", AccionRealizada),
-]
-
-
-def _serialize_row(row_dict: dict) -> dict:
-    """Convert date/datetime values to ISO 8601 strings for JSON serialization."""
-    result = {}
-    for key, value in row_dict.items():
-        if isinstance(value, datetime):
-            result[key] = value.isoformat()
-        elif isinstance(value, date):
-            result[key] = value.isoformat()
-        else:
-            result[key] = value
-    return result
-
-
-@router.get("/export")
-def export_database(db: Session = Depends(get_db)):
-    """Export all database tables as a JSON file."""
-    LOG.info("Database export initiated")
-
-    data = {}
-    record_counts = {}
-
-    for table_name, model in EXPORT_TABLES:
-        rows = db.query(model).all()
-        data[table_name] = [_serialize_row(model_to_dict(row)) for row in rows]
-        record_counts[table_name] = len(data[table_name])
-
-    export_payload = {
-        "export_metadata": {
-            "exported_at": datetime.now(timezone.utc).isoformat(),
-            "version": "1.0",
-            "tables": [name for name, _ in EXPORT_TABLES],
-            "record_counts": record_counts,
-        },
-        "data": data,
-    }
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(verify_auth)], route_class=TimedRoute)
+
 
-    total = sum(record_counts.values())
-    LOG.info(f"Database export completed: {record_counts} (total: {total})")
+@router.get("/export", dependencies=[Depends(admission("export")), Depends(statement_timeout("export"))])
+def export_database(
+    format: ExportFormat = Query("json", description="json, ndjson, csv (zip of CSVs) or parquet (zip of Parquet files)"),
+    compression: ExportCompression | None = Query(None, description="gzip or zstd (json/ndjson: whole file; parquet: column codec)"),
+):
+    """Export all database tables as a file, streamed table by table."""
+    try:
+        check_export_options(format, compression)
+    except ExportError as e:
+        LOG.warning(f"Database export rejected: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
 
+    LOG.info(f"Database export initiated ({format}, {compression or 'uncompressed'})")
     timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-    filename = f"task_manager_export_{timestamp}.json"
+    filename = export_filename(format, compression, timestamp)
 
-    return JSONResponse(
-        content=export_payload,
+    return StreamingResponse(
+        stream_export(format, compression, datetime.now(timezone.utc).isoformat()),
+        media_type=export_media_type(format, compression),
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+# Uploads larger than this are spooled to a temporary file instead of memory
+IMPORT_SPOOL_SIZE = 32 * 1024 * 1024
+# Received body bytes buffered before each write to the spool file, which runs
+# in the threadpool (the file may be on disk)
+IMPORT_WRITE_SIZE = 1024 * 1024
+
+
+def _restore_upload(upload, format: ExportFormat, compression: ExportCompression | None) -> dict:
+    conn = engine.raw_connection()
+    try:
+        return restore(conn, upload, format, compression, [name for name, _ in EXPORT_TABLES])
+    finally:
+        conn.close()
+
+
+@router.post("/import", dependencies=[Depends(admission("export")), Depends(mark_primary_reads)])
+async def import_database(
+    request: Request,
+    format: ExportFormat = Query("json", description="Format of the uploaded export file"),
+    compression: ExportCompression | None = Query(None, description="gzip or zstd, as passed to /export"),
+):
+    """Replace all tables with the content of an export file sent as the request body.
+
+    The restore uses COPY in a single transaction; on error nothing changes.
+    """
+    try:
+        check_export_options(format, compression)
+    except ExportError as e:
+        LOG.warning(f"Database import rejected: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    LOG.info(f"Database import initiated ({format}, {compression or 'uncompressed'})")
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as upload:
+        buffer = bytearray()
+        async for chunk in request.stream():
+            buffer += chunk
+            if len(buffer) >= IMPORT_WRITE_SIZE:
+                await run_in_threadpool(upload.write, bytes(buffer))
+                buffer.clear()
+        await run_in_threadpool(upload.write, bytes(buffer))
+        upload.seek(0)
+        try:
+            record_counts = await run_in_threadpool(_restore_upload, upload, format, compression)
+        except RestoreError as e:
+            LOG.warning(f"Database import failed: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return {"record_counts": record_counts, "total": sum(record_counts.values())}
+
+
+@router.get("/pool-stats")
+async def pool_stats():
+    """Return connection pool occupancy, checkout wait times and timeout counts."""
+    return get_pool_stats()
+
+
+@router.get("/replicas")
+async def replica_status():
+    """Return the read replicas with their health, replay lag and last check."""
+    return {"replicas": replicas.status()}
+
+
+@router.get("/slow-queries")
+async def slow_queries(limit: int = Query(50, ge=1, le=1000)):
+    """Return the slowest statement shapes and the most recent slow queries of this worker."""
+    return {
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "by_shape": slow_query_summary(),
+        "recent": recent_slow_queries(limit),
+    }
@@ -2,17 +2,20 @@
 
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from ..admission import admission
 from ..agent.orchestrator import stream_agent_response
 from ..auth import verify_auth
 from ..config import settings
+from ..database import READ_PRIMARY_HEADER
+from ..timing import TimedRoute
 
 logger = logging.getLogger("task_manager_agent")
 
-router = APIRouter(prefix="/agent", tags=["agent"], dependencies=[Depends(verify_auth)])
+router = APIRouter(prefix="/agent", tags=["agent"], dependencies=[Depends(verify_auth)], route_class=TimedRoute)
 
 
 class AgentChatRequest(BaseModel):
@@ -20,8 +23,8 @@ class AgentChatRequest(BaseModel):
     user_email: str | None = None
 
 
-@router.post("/chat")
-async def agent_chat(request: AgentChatRequest):
+@router.post("/chat", dependencies=[Depends(admission("agent"))])
+async def agent_chat(request: AgentChatRequest, http_request: Request):
     """Chat with the AI agent. Returns Server-Sent Events."""
     if not settings.ANTHROPIC_API_KEY:
         raise HTTPException(
@@ -36,7 +39,12 @@ async def agent_chat(request: AgentChatRequest):
         logger.info("Agent chat request from user: %s", request.user_email)
 
     return StreamingResponse(
-        stream_agent_response(request.messages, user_email=request.user_email),
+        stream_agent_response(
+            request.messages,
+            user_email=request.user_email,
+            # The agent's reads see what the user has just written
+            read_primary_until=http_request.headers.get(READ_PRIMARY_HEADER),
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
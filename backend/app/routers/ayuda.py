@@ -1,9 +1,11 @@
 """Ayuda endpoint — serves project README as markdown."""
 
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.auth import verify_auth
+from app.compression import precompressed_json
 from app.config import PROJECT_ROOT
+from app.timing import TimedRoute
 
 LOG = logging.getLogger("task_manager_backend")
 
@@ -11,14 +13,20 @@ router = APIRouter(
     prefix="/ayuda",
     tags=["ayuda"],
     dependencies=[Depends(verify_auth)],
+    route_class=TimedRoute,
 )
 
 
 @router.get("/readme")
-def get_readme():
-    """Return the project README.md content as JSON."""
+def get_readme(request: Request):
+    """Return the project README.md content as JSON (cached until the file changes)."""
     readme_path = PROJECT_ROOT / "README.md"
-    if not readme_path.exists():
+    try:
+        stat = readme_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="README.md not found")
-    content = readme_path.read_text(encoding="utf-8")
-    return {"content": content}
+    return precompressed_json(
+        request,
+        ("readme", stat.st_mtime_ns, stat.st_size),
+        lambda: {"content": readme_path.read_text(encoding="utf-8")},
+    )
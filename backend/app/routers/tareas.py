@@ -3,30 +3,57 @@
 import logging
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import Date, DateTime, Integer, bindparam, distinct, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.admission import admission
 from app.auth import verify_auth
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Tarea, AccionRealizada
 from app.schemas import TareaCreate, TareaUpdate, SearchRequest, BulkUpdateRequest, BulkUpdateResponse, CambiarFechaRequest, CambiarFechaResponse
-from app.crud import CRUDBase, model_to_dict
+from app.crud import CRUDBase, any_id, model_to_dict, parse_fields_param
+from app.acciones_batch import load_acciones_by_tarea, tarea_completa_query
+from app.pipeline import run_statements
+from app.query_limits import statement_timeout
 from app.search import search
+from app.timing import TimedRoute
 
 LOG = logging.getLogger("task_manager_backend")
 
-router = APIRouter(prefix="/tareas", tags=["tareas"], dependencies=[Depends(verify_auth)])
+router = APIRouter(prefix="/tareas", tags=["tareas"], dependencies=[Depends(verify_auth)], route_class=TimedRoute)
 crud_tareas = CRUDBase(Tarea)
 
+# POST /{tarea_id}/complete, run through pipeline.run_statements. The acciones
+# go first, so the returned tarea already has the fecha_siguiente_accion
+# recomputed by their triggers.
+_COMPLETE_ACCIONES = (
+    update(AccionRealizada)
+    .where(
+        AccionRealizada.tarea_id == bindparam("id_tarea", type_=Integer),
+        ~func.lower(AccionRealizada.estado).in_(["completada", "completado"]),
+    )
+    .values(estado="Completada", fecha_actualizacion=bindparam("now", type_=DateTime))
+    .returning(AccionRealizada.id)
+)
+_COMPLETE_TAREA = (
+    update(Tarea)
+    .where(Tarea.tarea_id == bindparam("id_tarea", type_=Integer))
+    .values(estado="Completado", fecha_actualizacion=bindparam("now", type_=DateTime))
+    .returning(*Tarea.__table__.columns)
+)
+
 
 @router.get("/filter-options")
-def get_filter_options(db: Session = Depends(get_db)):
+async def get_filter_options(db: AsyncSession = Depends(get_read_db)):
     """Get distinct values for filter dropdowns."""
-    from sqlalchemy import distinct
-    responsables = [r[0] for r in db.query(distinct(Tarea.responsable)).filter(Tarea.responsable.isnot(None)).order_by(Tarea.responsable).all()]
-    temas = [r[0] for r in db.query(distinct(Tarea.tema)).filter(Tarea.tema.isnot(None)).order_by(Tarea.tema).all()]
-    estados = [r[0] for r in db.query(distinct(Tarea.estado)).filter(Tarea.estado.isnot(None)).order_by(Tarea.estado).all()]
+    async def _distinct_values(column) -> list:
+        result = await db.scalars(select(distinct(column)).where(column.isnot(None)).order_by(column))
+        return list(result.all())
+
+    responsables = await _distinct_values(Tarea.responsable)
+    temas = await _distinct_values(Tarea.tema)
+    estados = await _distinct_values(Tarea.estado)
     return {
         "responsables": responsables,
         "temas": temas,
@@ -34,106 +61,117 @@ def get_filter_options(db: Session = Depends(get_db)):
     }
 
 
-@router.post("/search")
-def search_tareas(request: SearchRequest, db: Session = Depends(get_db)):
-    """Search tareas with flexible filters."""
-    return search(db, Tarea, request)
+@router.post("/search", dependencies=[Depends(admission("search")), Depends(statement_timeout("search"))])
+async def search_tareas(request: SearchRequest, db: AsyncSession = Depends(get_read_db)):
+    """Search tareas with flexible filters.
+
+    With ``include=["acciones"]`` each row gets an ``acciones`` list, loaded
+    for the whole page in one query.
+    """
+    result = await search(db, Tarea, request)
+    if "acciones" in request.include:
+        acciones = await load_acciones_by_tarea(
+            db,
+            [row["tarea_id"] for row in result["data"]],
+            estados=["Pendiente"] if request.acciones_scope == "pending" else None,
+        )
+        for row in result["data"]:
+            row["acciones"] = acciones[row["tarea_id"]]
+    return result
 
 
 @router.get("/")
-def list_tareas(
+async def list_tareas(
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None, description="next_cursor from a previous page (keyset paging)"),
+    fields: str | None = Query(None, description="Comma-separated columns to return (primary key always included)"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List all tareas with pagination."""
-    total = crud_tareas.count(db)
-    items = crud_tareas.get_multi(db, skip=offset, limit=limit)
+    """List all tareas with offset or cursor pagination."""
+    total = await crud_tareas.count(db)
+    items, next_cursor = await crud_tareas.get_page(
+        db, limit=limit, skip=offset, cursor=cursor, fields=parse_fields_param(fields)
+    )
     return {
         "total": total,
-        "data": [model_to_dict(item) for item in items],
+        "data": items,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
     }
 
 
-def _sync_fecha_siguiente_accion(db: Session, tarea_id: int):
-    """Recalculate tarea's fecha_siguiente_accion from pending acciones."""
-    min_fecha = (
-        db.query(func.min(AccionRealizada.fecha_accion))
-        .filter(
-            AccionRealizada.tarea_id == tarea_id,
-            func.lower(AccionRealizada.estado) == "pendiente",
-        )
-        .scalar()
-    )
-    tarea = db.query(Tarea).filter(Tarea.tarea_id == tarea_id).first()
-    if tarea:
-        tarea.fecha_siguiente_accion = min_fecha
-        tarea.fecha_actualizacion = datetime.now()
-        db.commit()
-        db.refresh(tarea)
-
+@router.post("/bulk-update", dependencies=[Depends(admission("bulk"))])
+async def bulk_update_tareas(req: BulkUpdateRequest, db: AsyncSession = Depends(get_db)):
+    """Bulk update tareas: change dates or complete pending acciones and create new ones.
 
-@router.post("/bulk-update")
-def bulk_update_tareas(req: BulkUpdateRequest, db: Session = Depends(get_db)):
-    """Bulk update tareas: change dates or complete pending acciones and create new ones."""
+    Runs a fixed number of set-based statements over ``tarea_id = ANY(:ids)``
+    in one transaction, whatever the number of tareas; counts come from
+    RETURNING. Unknown tarea_ids are ignored.
+    """
     if not req.tarea_ids:
         raise HTTPException(status_code=400, detail="tarea_ids must not be empty")
 
     if req.operation == "complete_and_create" and not req.accion:
         raise HTTPException(status_code=400, detail="accion is required for complete_and_create operation")
 
-    updated_tareas = 0
-    updated_acciones = 0
+    now = datetime.now()
+    pending = func.lower(AccionRealizada.estado) == "pendiente"
     created_acciones = 0
 
-    for tarea_id in req.tarea_ids:
-        tarea = db.query(Tarea).filter(Tarea.tarea_id == tarea_id).first()
-        if not tarea:
-            continue
-
-        if req.operation == "change_date":
-            tarea.fecha_siguiente_accion = req.fecha
-            tarea.fecha_actualizacion = datetime.now()
-            updated_tareas += 1
+    if req.operation == "change_date":
+        acciones_result = await db.execute(
+            update(AccionRealizada)
+            .where(any_id(AccionRealizada.tarea_id, req.tarea_ids), pending)
+            .values(fecha_accion=req.fecha, fecha_actualizacion=now)
+            .returning(AccionRealizada.id)
+        )
+        updated_acciones = len(acciones_result.all())
 
-            pending = db.query(AccionRealizada).filter(
-                AccionRealizada.tarea_id == tarea_id,
-                func.lower(AccionRealizada.estado) == "pendiente",
-            ).all()
-            for acc in pending:
-                acc.fecha_accion = req.fecha
-                acc.fecha_actualizacion = datetime.now()
-                updated_acciones += 1
-
-        elif req.operation == "complete_and_create":
-            pending = db.query(AccionRealizada).filter(
-                AccionRealizada.tarea_id == tarea_id,
-                func.lower(AccionRealizada.estado) == "pendiente",
-            ).all()
-            for acc in pending:
-                acc.estado = "Completada"
-                acc.fecha_actualizacion = datetime.now()
-                updated_acciones += 1
-
-            new_accion = AccionRealizada(
-                tarea_id=tarea_id,
-                accion=req.accion,
-                fecha_accion=req.fecha,
-                estado="Pendiente",
+        tareas_result = await db.execute(
+            update(Tarea)
+            .where(any_id(Tarea.tarea_id, req.tarea_ids))
+            .values(fecha_siguiente_accion=req.fecha, fecha_actualizacion=now)
+            .returning(Tarea.tarea_id)
+        )
+        updated_tareas = len(tareas_result.all())
+
+    else:  # complete_and_create
+        acciones_result = await db.execute(
+            update(AccionRealizada)
+            .where(any_id(AccionRealizada.tarea_id, req.tarea_ids), pending)
+            .values(estado="Completada", fecha_actualizacion=now)
+            .returning(AccionRealizada.id)
+        )
+        updated_acciones = len(acciones_result.all())
+
+        # One new pending accion per existing tarea, as a single INSERT ... SELECT
+        created_result = await db.execute(
+            insert(AccionRealizada)
+            .from_select(
+                ["tarea_id", "accion", "fecha_accion", "estado"],
+                select(
+                    Tarea.tarea_id,
+                    literal(req.accion),
+                    literal(req.fecha, Date),
+                    literal("Pendiente"),
+                ).where(any_id(Tarea.tarea_id, req.tarea_ids)),
             )
-            db.add(new_accion)
-            created_acciones += 1
-            updated_tareas += 1
-
-    db.commit()
+            .returning(AccionRealizada.id)
+        )
+        created_acciones = len(created_result.all())
+
+        # fecha_siguiente_accion was already recomputed by the acciones triggers
+        tareas_result = await db.execute(
+            update(Tarea)
+            .where(any_id(Tarea.tarea_id, req.tarea_ids))
+            .values(fecha_actualizacion=now)
+            .returning(Tarea.tarea_id)
+        )
+        updated_tareas = len(tareas_result.all())
 
-    # Sync fecha_siguiente_accion for operations that modify acciones states
-    # (skip for change_date — fecha is already set directly on the tarea)
-    if req.operation != "change_date":
-        for tarea_id in req.tarea_ids:
-            _sync_fecha_siguiente_accion(db, tarea_id)
+    await db.commit()
 
     LOG.info(f"Bulk {req.operation}: {updated_tareas} tareas, {updated_acciones} acciones updated, {created_acciones} acciones created")
     return BulkUpdateResponse(
@@ -144,35 +182,29 @@ def bulk_update_tareas(req: BulkUpdateRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/{tarea_id}/complete")
-def complete_tarea(tarea_id: int, db: Session = Depends(get_db)):
-    """Mark a tarea as Completado and all non-completed acciones as Completada."""
-    tarea = db.query(Tarea).filter(Tarea.tarea_id == tarea_id).first()
-    if not tarea:
+async def complete_tarea(tarea_id: int, db: AsyncSession = Depends(get_db)):
+    """Mark a tarea as Completado and all non-completed acciones as Completada.
+
+    Two UPDATE ... RETURNING statements, pipelined with psycopg (see
+    ``pipeline.run_statements``). Both match no row when the tarea does not
+    exist (its acciones reference it), so a 404 has written nothing; the
+    transaction is still rolled back before raising.
+    """
+    params = {"id_tarea": tarea_id, "now": datetime.now()}
+    acciones_rows, tarea_rows = await run_statements(db, [(_COMPLETE_ACCIONES, params), (_COMPLETE_TAREA, params)])
+    if not tarea_rows:
+        await db.rollback()
         raise HTTPException(status_code=404, detail=f"Tarea {tarea_id} no encontrada")
+    await db.commit()
 
-    tarea.estado = "Completado"
-    tarea.fecha_actualizacion = datetime.now()
-
-    pending = db.query(AccionRealizada).filter(
-        AccionRealizada.tarea_id == tarea_id,
-        ~func.lower(AccionRealizada.estado).in_(["completada", "completado"]),
-    ).all()
-
-    for acc in pending:
-        acc.estado = "Completada"
-        acc.fecha_actualizacion = datetime.now()
-
-    db.commit()
-    db.refresh(tarea)
-
-    LOG.info(f"Completed tarea {tarea_id}: {len(pending)} acciones marked as Completada")
-    return {"tarea": model_to_dict(tarea), "acciones_updated": len(pending)}
+    LOG.info(f"Completed tarea {tarea_id}: {len(acciones_rows)} acciones marked as Completada")
+    return {"tarea": tarea_rows[0], "acciones_updated": len(acciones_rows)}
 
 
 @router.put("/{tarea_id}/cambiar-fecha")
-def cambiar_fecha(tarea_id: int, req: CambiarFechaRequest, db: Session = Depends(get_db)):
+async def cambiar_fecha(tarea_id: int, req: CambiarFechaRequest, db: AsyncSession = Depends(get_db)):
     """Change a tarea's fecha_siguiente_accion and propagate to min-fecha pending acciones."""
-    tarea = db.query(Tarea).filter(Tarea.tarea_id == tarea_id).first()
+    tarea = await db.get(Tarea, tarea_id)
     if not tarea:
         raise HTTPException(status_code=404, detail=f"Tarea {tarea_id} no encontrada")
 
@@ -180,10 +212,10 @@ def cambiar_fecha(tarea_id: int, req: CambiarFechaRequest, db: Session = Depends
     tarea.fecha_actualizacion = datetime.now()
 
     updated_acciones = 0
-    pending = db.query(AccionRealizada).filter(
+    pending = (await db.scalars(select(AccionRealizada).where(
         AccionRealizada.tarea_id == tarea_id,
         func.lower(AccionRealizada.estado) == "pendiente",
-    ).all()
+    ))).all()
 
     if pending:
         min_fecha = min(
@@ -197,42 +229,51 @@ def cambiar_fecha(tarea_id: int, req: CambiarFechaRequest, db: Session = Depends
                     acc.fecha_actualizacion = datetime.now()
                     updated_acciones += 1
 
-    db.commit()
-    db.refresh(tarea)
+    await db.commit()
+    await db.refresh(tarea)
 
     LOG.info(f"Cambiar fecha tarea {tarea_id}: fecha={req.fecha}, {updated_acciones} acciones updated")
     return CambiarFechaResponse(updated_tarea=True, updated_acciones=updated_acciones)
 
 
 @router.get("/{tarea_id}")
-def get_tarea(tarea_id: int, db: Session = Depends(get_db)):
+async def get_tarea(tarea_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a tarea by tarea_id."""
-    item = crud_tareas.get(db, tarea_id)
+    item = await crud_tareas.get(db, tarea_id)
     if not item:
         raise HTTPException(status_code=404, detail=f"Tarea {tarea_id} no encontrada")
     return model_to_dict(item)
 
 
+@router.get("/{tarea_id}/completa")
+async def get_tarea_completa(tarea_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Get a tarea with its acciones (newest first) in a single query."""
+    content = await db.scalar(tarea_completa_query(tarea_id))
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Tarea {tarea_id} no encontrada")
+    return Response(content=content, media_type="application/json")
+
+
 @router.post("/", status_code=201)
-def create_tarea(tarea_in: TareaCreate, db: Session = Depends(get_db)):
+async def create_tarea(tarea_in: TareaCreate, db: AsyncSession = Depends(get_db)):
     """Create a new tarea."""
-    item = crud_tareas.create(db, tarea_in.model_dump())
+    item = await crud_tareas.create(db, tarea_in.model_dump())
     return model_to_dict(item)
 
 
 @router.put("/{tarea_id}")
-def update_tarea(tarea_id: int, tarea_in: TareaUpdate, db: Session = Depends(get_db)):
+async def update_tarea(tarea_id: int, tarea_in: TareaUpdate, db: AsyncSession = Depends(get_db)):
     """Update a tarea."""
-    item = crud_tareas.get(db, tarea_id)
+    item = await crud_tareas.get(db, tarea_id)
     if not item:
         raise HTTPException(status_code=404, detail=f"Tarea {tarea_id} no encontrada")
-    updated = crud_tareas.update(db, item, tarea_in.model_dump(exclude_unset=True))
+    updated = await crud_tareas.update(db, item, tarea_in.model_dump(exclude_unset=True))
     return model_to_dict(updated)
 
 
 @router.delete("/{tarea_id}")
-def delete_tarea(tarea_id: int, db: Session = Depends(get_db)):
+async def delete_tarea(tarea_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a tarea (cascades to acciones)."""
-    if not crud_tareas.delete(db, tarea_id):
+    if not await crud_tareas.delete(db, tarea_id):
         raise HTTPException(status_code=404, detail=f"Tarea {tarea_id} no encontrada")
     return {"detail": f"Tarea {tarea_id} eliminada"}
@@ -19,13 +19,19 @@ class SearchRequest(BaseModel):
     order_dir: str = "asc"
     limit: int = 50
     offset: int = 0
+    cursor: str | None = None  # next_cursor from a previous page; enables keyset paging
+    count_mode: Literal["exact", "none", "estimated", "window"] = "exact"
+    fields: list[str] | None = None  # column projection; None returns every column
+    include: list[Literal["acciones"]] = []  # related rows to nest into each result
+    acciones_scope: Literal["all", "pending"] = "all"  # which acciones include=acciones embeds
 
 
 class PaginatedResponse(BaseModel):
-    total: int
+    total: int | None  # None when count_mode is "none" (or "window" on cursor pages)
     data: list[dict]
     limit: int
     offset: int
+    next_cursor: str | None = None
 
 
 # --- Tareas ---
@@ -65,6 +71,13 @@ class AccionCreate(BaseModel):
     estado: str | None = None
 
 
+class AccionesByTareasRequest(BaseModel):
+    tarea_ids: list[int]
+    estados: list[str] | None = None  # case-insensitive match on estado
+    fecha_desde: date | None = None  # fecha_accion >= fecha_desde
+    fecha_hasta: date | None = None  # fecha_accion <= fecha_hasta
+
+
 class AccionUpdate(BaseModel):
     accion: str | None = None
     fecha_accion: date | None = None
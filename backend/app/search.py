@@ -4,48 +4,85 @@ Flexible search operations for database models.
 This module provides advanced search capabilities.
 """
 import logging
+from datetime import date, datetime
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import inspect
+from sqlalchemy import func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Type, Any
+from .config import settings
 from .database import Base
 from .schemas import SearchRequest, SearchFilter
-from .crud import model_to_dict
+from .crud import model_to_dict, projection_select, resolve_fields, row_to_dict
+from .explain import explain_plan
+from .query_limits import check_search_cost
+from .pagination import keyset_segments, order_clauses, resolve_order_column, split_page
 
 logger = logging.getLogger(__name__)
 
 
+def coerce_value(column, value: Any) -> Any:
+    """Convert a JSON filter value to the Python type of ``column``.
+
+    asyncpg binds parameters with the column's type and does not cast
+    strings, so dates ("2026-01-01") and numeric ids ("5") sent as JSON
+    strings are parsed here. Raises ValueError when the value does not fit.
+    """
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+        if python_type is date:
+            if isinstance(value, datetime):
+                return value.date()
+            return value if isinstance(value, date) else date.fromisoformat(value)
+        if python_type is int:
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise ValueError
+            return int(value)
+        if python_type is str:
+            return value if isinstance(value, str) else str(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {column.key}: {value!r}") from None
+    return value
+
+
 def apply_filter(query, model: Type[Base], filter: SearchFilter):
     """Apply a single filter to a query."""
     column = getattr(model, filter.field, None)
     if column is None:
         raise ValueError(f"Invalid field: {filter.field}")
+    if filter.operator in ("in", "not_in"):
+        values = filter.value if isinstance(filter.value, list) else [filter.value]
+        values = [coerce_value(column, v) for v in values]
+    elif filter.operator not in ("is_null", "is_not_null"):
+        value = coerce_value(column, filter.value)
 
     match filter.operator:
         case "eq":
-            return query.filter(column == filter.value)
+            return query.filter(column == value)
         case "ne":
-            return query.filter(column != filter.value)
+            return query.filter(column != value)
         case "gt":
-            return query.filter(column > filter.value)
+            return query.filter(column > value)
         case "gte":
-            return query.filter(column >= filter.value)
+            return query.filter(column >= value)
         case "lt":
-            return query.filter(column < filter.value)
+            return query.filter(column < value)
         case "lte":
-            return query.filter(column <= filter.value)
+            return query.filter(column <= value)
         case "like":
-            return query.filter(column.like(filter.value))
+            return query.filter(column.like(value))
         case "ilike":
-            return query.filter(column.ilike(filter.value))
+            return query.filter(column.ilike(value))
         case "in":
-            if isinstance(filter.value, list):
-                return query.filter(column.in_(filter.value))
-            return query.filter(column.in_([filter.value]))
+            return query.filter(column.in_(values))
         case "not_in":
-            if isinstance(filter.value, list):
-                return query.filter(~column.in_(filter.value))
-            return query.filter(~column.in_([filter.value]))
+            return query.filter(~column.in_(values))
         case "is_null":
             return query.filter(column.is_(None))
         case "is_not_null":
@@ -54,8 +91,19 @@ def apply_filter(query, model: Type[Base], filter: SearchFilter):
             raise ValueError(f"Invalid operator: {filter.operator}")
 
 
-def search(
-    db: Session,
+async def _fetch(db: AsyncSession, query, as_rows: bool) -> list:
+    result = await db.execute(query)
+    return list(result.all()) if as_rows else list(result.scalars().all())
+
+
+async def _check_cost(db: AsyncSession, statement, table_name: str) -> None:
+    """Reject ``statement`` with 400 when its planner cost is above ``SEARCH_MAX_COST``."""
+    if settings.SEARCH_MAX_COST > 0:
+        check_search_cost(await explain_plan(db, statement), table_name)
+
+
+async def search(
+    db: AsyncSession,
     model: Type[Base],
     request: SearchRequest,
 ) -> dict[str, Any]:
@@ -65,13 +113,33 @@ def search(
     Args:
         db: Database session
         model: SQLAlchemy model class
-        request: Search request with filters, ordering, pagination
+        request: Search request with filters, ordering, pagination.
+            When ``request.cursor`` is set, the page is fetched by keyset
+            seek after the cursor and ``offset`` is ignored.
 
     Returns:
-        Dictionary with total count, data, limit, and offset
+        Dictionary with total count, data, limit, offset and next_cursor.
+        How ``total`` is obtained depends on ``request.count_mode``:
+
+        - ``exact``: separate ``COUNT(*)`` over the filtered query.
+        - ``none``: not computed (``None``).
+        - ``estimated``: the planner's row estimate for the filtered query.
+        - ``window``: ``COUNT(*) OVER()`` returned with the page itself. Only
+          offset pages carry it; cursor pages return ``None`` because the
+          keyset predicate excludes the rows before the cursor.
     """
     table_name = model.__tablename__
-    query = db.query(model)
+    fields = resolve_fields(model, request.fields)
+
+    # Resolve ordering first: a projection must also select the sort column
+    order_by = request.order_by
+    if order_by and resolve_order_column(model, order_by) is None:
+        order_by = None
+
+    if fields is None:
+        query = select(model)
+    else:
+        query = projection_select(model, fields, extra=[order_by] if order_by else [])
 
     # Apply filters
     for f in request.filters:
@@ -81,28 +149,65 @@ def search(
             logger.warning(f"Invalid filter: {e}")
             raise HTTPException(status_code=400, detail=str(e))
 
-    # Get total count before pagination
-    total = query.count()
-
-    # Apply ordering
-    if request.order_by:
-        column = getattr(model, request.order_by, None)
-        if column is not None:
-            if request.order_dir == "desc":
-                column = column.desc()
-            query = query.order_by(column)
+    # Planner estimate for the whole filtered set, used as the estimated count
+    total = None
+    if request.count_mode == "estimated":
+        total = int((await explain_plan(db, query))["Plan Rows"])
+    count_query = select(func.count()).select_from(query.subquery())
+    with_window = request.count_mode == "window" and not request.cursor
+    if with_window:
+        query = query.add_columns(func.count().over().label("total"))
+
+    # Apply ordering (primary key as tiebreaker keeps pages stable)
+    query = query.order_by(*order_clauses(model, order_by, request.order_dir))
+
+    # Apply pagination: keyset seek when a cursor is given, offset otherwise.
+    # One extra row is fetched to know whether a next page exists.
+    if request.cursor:
+        segments = [
+            query.where(segment) for segment in keyset_segments(model, request.cursor, order_by, request.order_dir)
+        ]
+        page_query = segments[0].limit(request.limit + 1)
+    else:
+        page_query = query.offset(request.offset).limit(request.limit + 1)
+
+    # Cost ceiling: the statements that will run, with their LIMIT, are
+    # costed before any of them reads a row
+    await _check_cost(db, page_query, table_name)
+    if request.count_mode == "exact":
+        await _check_cost(db, count_query, table_name)
+        total = await db.scalar(count_query)
+
+    as_rows = with_window or fields is not None
+    rows = await _fetch(db, page_query, as_rows)
+    if request.cursor:
+        for segment_query in segments[1:]:
+            if len(rows) > request.limit:
+                break
+            segment_query = segment_query.limit(request.limit + 1 - len(rows))
+            await _check_cost(db, segment_query, table_name)
+            rows += await _fetch(db, segment_query, as_rows)
+    if with_window:
+        if rows:
+            total = rows[0][-1]
+        elif request.offset == 0:
+            total = 0
         else:
-            logger.warning(f"Invalid order_by field: {request.order_by}")
-
-    # Apply pagination
-    data = query.offset(request.offset).limit(request.limit).all()
+            # Offset past the end: the window never ran over a row
+            total = await db.scalar(count_query)
+        if fields is None:
+            rows = [row[0] for row in rows]
+    data, next_cursor = split_page(rows, request.limit, model, order_by, request.order_dir)
 
     # Convert to dictionaries
-    data_dicts = [model_to_dict(row) for row in data]
+    if fields is None:
+        data_dicts = [model_to_dict(row) for row in data]
+    else:
+        data_dicts = [row_to_dict(row, fields) for row in data]
 
     logger.info(
         f"Search on {table_name}: "
-        f"{len(request.filters)} filters, {total} total, "
+        f"{len(request.filters)} filters, {total} total ({request.count_mode}), "
         f"returning {len(data_dicts)} records"
     )
 
@@ -110,7 +215,8 @@ def search(
         "total": total,
         "data": data_dicts,
         "limit": request.limit,
-        "offset": request.offset
+        "offset": request.offset,
+        "next_cursor": next_cursor,
     }
 
 
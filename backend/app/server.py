@@ -0,0 +1,175 @@
+"""
+Server launcher: ``python -m app.server`` (``python -m app.main`` delegates here).
+
+``API_MODE`` selects how the API is served:
+
+- ``development`` (default): one uvicorn process with auto-reload.
+- ``production``: no reload, ``API_WORKERS`` worker processes (0 = one per
+  available CPU core), uvloop and httptools when installed, and a graceful
+  drain of up to ``API_GRACEFUL_TIMEOUT`` seconds for in-flight requests
+  (streams included) on SIGTERM.
+
+In production, when gunicorn and uvicorn-worker are installed
+(``task-manager-backend[server]``, not available on Windows), the app is
+imported once in the master process and the workers are forked from it
+(``preload_app``): startup cost is paid once and the imported code is shared
+copy-on-write. The connection pools are discarded in each child right after
+the fork, so no socket is shared across processes. Without gunicorn, uvicorn's
+own supervisor starts each worker as a fresh process.
+
+Every worker has its own connection pools: the primary, and each read
+replica, must accept ``workers * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)``
+connections.
+
+With more than one worker, the workers record their metrics into
+``PROMETHEUS_MULTIPROC_DIR`` and ``/metrics`` reads all of them (see
+``app/metrics.py``). It is exported before the app, and so
+``prometheus_client``, is imported. Without an explicit
+``PROMETHEUS_MULTIPROC_DIR`` a temporary directory is created here and
+removed on exit; an explicit one is emptied at startup. Gunicorn's
+``child_exit`` hook drops the gauges of each exited worker (and
+``when_ready`` those the master set while importing the app).
+"""
+import atexit
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP = "app.main:app"
+
+
+def worker_count() -> int:
+    """``API_WORKERS``, or the number of CPU cores this process may use."""
+    if settings.API_WORKERS > 0:
+        return settings.API_WORKERS
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _port() -> int:
+    # PaaS platforms (Railway, Render, Heroku) set PORT
+    return int(os.environ.get("PORT", settings.API_PORT))
+
+
+def _prepare_metrics_dir() -> None:
+    """Give the workers an empty ``PROMETHEUS_MULTIPROC_DIR`` to record their metrics in."""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        directory = Path(settings.PROMETHEUS_MULTIPROC_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        for path in directory.glob("*.db"):
+            path.unlink()
+    else:
+        directory = Path(tempfile.mkdtemp(prefix="task-manager-metrics-"))
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    # prometheus_client reads the environment (a value from .env only reaches settings)
+    settings.PROMETHEUS_MULTIPROC_DIR = str(directory)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(directory)
+
+
+def _have_gunicorn() -> bool:
+    if sys.platform == "win32":
+        return False
+    try:
+        import gunicorn  # noqa: F401
+        import uvicorn_worker  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _post_fork(server, worker) -> None:
+    """Give each forked worker its own (empty) connection pools."""
+    from app.database import all_engines
+
+    for engine in all_engines():
+        engine.dispose(close=False)
+
+
+def _when_ready(server) -> None:
+    """Drop the gauges the master set while importing the app (it serves no requests)."""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def _child_exit(server, worker) -> None:
+    """Drop the live gauges of an exited worker from ``/metrics``."""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def _run_gunicorn(workers: int) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class _Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{settings.API_HOST}:{_port()}",
+                "workers": workers,
+                "worker_class": "uvicorn_worker.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": settings.API_GRACEFUL_TIMEOUT,
+                "keepalive": 5,
+                "post_fork": _post_fork,
+                "when_ready": _when_ready,
+                "child_exit": _child_exit,
+                "accesslog": None,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    _Application().run()
+
+
+def run() -> None:
+    """Start the API as configured by ``API_MODE``."""
+    if settings.API_MODE != "production":
+        uvicorn.run(APP, host=settings.API_HOST, port=_port(), reload=True)
+        return
+
+    workers = worker_count()
+    if workers > 1:
+        _prepare_metrics_dir()
+    # Importing the app configures logging before the first message
+    from app.main import app  # noqa: F401
+
+    if _have_gunicorn():
+        logger.info(f"Production server: {workers} workers (gunicorn, preloaded app)")
+        _run_gunicorn(workers)
+        return
+
+    logger.warning(
+        f"Production server: {workers} workers (uvicorn); install task-manager-backend[server] "
+        "on Linux to preload the app before forking"
+    )
+    uvicorn.run(
+        APP,
+        host=settings.API_HOST,
+        port=_port(),
+        workers=workers,
+        reload=False,
+        access_log=False,
+        timeout_graceful_shutdown=settings.API_GRACEFUL_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,200 @@
+"""
+Slow-query recorder.
+
+Cursor events on both engines time every statement. One that takes longer
+than ``SLOW_QUERY_MS`` is recorded with:
+
+- its shape (``timing.statement_shape``) and full SQL,
+- its parameters, masked by name per ``SENSITIVE_PATTERNS``,
+- its duration and the request it ran in,
+- an ``EXPLAIN (FORMAT JSON)`` plan (``SLOW_QUERY_EXPLAIN``; not ANALYZE, so
+  the statement is not run again).
+
+The plan is captured on a background thread with its own connection from the
+sync engine, so the slow request is not delayed further and its transaction is
+never touched; statements from the async engine are rewritten from asyncpg's
+``$n`` placeholders for psycopg2. Plans are skipped when a parameter was masked
+(the plan text would show its value) and when too many are already queued.
+
+Entries go to ``logs/<SLOW_QUERY_LOG_FILE>`` (one JSON object per line,
+rotated) and to an in-memory buffer of the last ``SLOW_QUERY_BUFFER`` entries
+served by ``GET /admin/slow-queries``. Both are per worker process.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import PROJECT_ROOT, is_sensitive, settings
+from app.explain import parse_plan
+from app.timing import current_timings, pop_start, statement_shape
+
+logger = logging.getLogger(__name__)
+
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# EXPLAINs waiting for the background thread; beyond this, entries are kept without a plan
+MAX_PENDING_EXPLAINS = 20
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES)\b", re.IGNORECASE)
+_DOLLAR_PARAM = re.compile(r"\$(\d+)")
+
+_entries: deque[dict] = deque(maxlen=settings.SLOW_QUERY_BUFFER)
+_entries_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_pending = 0
+_explain_engine: Engine | None = None
+
+_file_logger = logging.getLogger("task_manager_slow_queries")
+_file_logger.propagate = False
+
+
+def _ensure_file_handler() -> None:
+    if not _file_logger.handlers:
+        logs_dir = PROJECT_ROOT / "logs"
+        logs_dir.mkdir(exist_ok=True)
+        handler = RotatingFileHandler(
+            logs_dir / settings.SLOW_QUERY_LOG_FILE,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _file_logger.addHandler(handler)
+        _file_logger.setLevel(logging.INFO)
+
+
+def _masked_parameters(parameters: Any, context) -> tuple[dict[str, Any], bool]:
+    """Parameters by bind name with sensitive values replaced, and whether any was."""
+    if isinstance(parameters, dict):
+        named = dict(parameters)
+    else:
+        # Positional (asyncpg): names come from the compiled statement
+        names = getattr(getattr(context, "compiled", None), "positiontup", None) or []
+        values = list(parameters or ())
+        named = {names[i] if i < len(names) else f"${i + 1}": value for i, value in enumerate(values)}
+    masked = False
+    for name in named:
+        if is_sensitive(name):
+            named[name] = "***"
+            masked = True
+    return named, masked
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["slow_query_start"].pop()
+    if duration * 1000 < settings.SLOW_QUERY_MS or statement.lstrip()[:7].upper() == "EXPLAIN":
+        return
+
+    named, masked = _masked_parameters(parameters, context)
+    timings = current_timings()
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "duration_ms": round(duration * 1000, 1),
+        "request": timings.request if timings is not None else None,
+        "shape": statement_shape(statement),
+        "statement": statement,
+        "parameters": named,
+        "executemany": executemany,
+        "plan": None,
+    }
+
+    explain = None
+    if masked:
+        entry["plan_error"] = "skipped: sensitive parameters"
+    elif settings.SLOW_QUERY_EXPLAIN and not executemany and _EXPLAINABLE.match(statement):
+        explain = (statement, parameters, conn.dialect.driver)
+    _submit(entry, explain)
+
+
+def _handle_error(context):
+    pop_start(context, "slow_query_start")
+
+
+def _submit(entry: dict, explain: tuple | None) -> None:
+    global _pending
+    with _entries_lock:
+        if explain is not None and _pending >= MAX_PENDING_EXPLAINS:
+            entry["plan_error"] = "skipped: too many pending EXPLAINs"
+            explain = None
+        _pending += 1
+    _executor.submit(_record, entry, explain)
+
+
+def _record(entry: dict, explain: tuple | None) -> None:
+    global _pending
+    try:
+        if explain is not None:
+            try:
+                entry["plan"] = _explain(*explain)
+            except Exception as e:
+                entry["plan_error"] = str(e).strip().splitlines()[0]
+        with _entries_lock:
+            _entries.append(entry)
+        _ensure_file_handler()
+        _file_logger.info(json.dumps(entry, default=str, ensure_ascii=False))
+        logger.warning(f"Slow query ({entry['duration_ms']}ms, {entry['request'] or 'no request'}): {entry['shape'][:200]}")
+    finally:
+        with _entries_lock:
+            _pending -= 1
+
+
+def _explain(statement: str, parameters: Any, driver: str) -> dict:
+    if driver == "asyncpg":
+        # $n -> %(pn)s for psycopg2 (literal % must be doubled)
+        statement = _DOLLAR_PARAM.sub(r"%(p\1)s", statement.replace("%", "%%"))
+        parameters = {f"p{i + 1}": value for i, value in enumerate(parameters or ())}
+    conn = _explain_engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        raw = cursor.fetchone()[0]
+        conn.rollback()
+    finally:
+        conn.close()
+    return parse_plan(raw)
+
+
+def instrument_slow_queries(engines: list[Engine], explain_engine: Engine) -> None:
+    """Record slow statements of ``engines``; plans are taken on ``explain_engine`` (psycopg2)."""
+    global _explain_engine
+    if settings.SLOW_QUERY_MS <= 0:
+        return
+    _explain_engine = explain_engine
+    for target in engines:
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
+
+
+def recent_slow_queries(limit: int | None = None) -> list[dict]:
+    """Recorded slow queries, newest first."""
+    with _entries_lock:
+        entries = list(_entries)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def slow_query_summary() -> list[dict]:
+    """Recorded slow queries grouped by shape, by total time."""
+    groups: dict[str, dict] = {}
+    for entry in recent_slow_queries():
+        group = groups.setdefault(entry["shape"], {"shape": entry["shape"], "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        group["count"] += 1
+        group["total_ms"] = round(group["total_ms"] + entry["duration_ms"], 1)
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+    return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
@@ -0,0 +1,267 @@
+"""
+Per-request timing and the ``Server-Timing`` response header.
+
+``TimingMiddleware`` is a pure ASGI middleware: it measures each request with
+``time.perf_counter()``, adds a ``Server-Timing`` header to the response start
+and logs the request when the response is complete. It only looks at the
+``http.response.start`` message, so streamed bodies (agent SSE, exports) are
+passed through untouched. The same measurements feed the request metrics
+(``metrics.py``).
+
+The header splits the time until the response started into:
+
+- ``db``: SQL execution, measured by cursor events on both engines
+  (``desc`` carries the statement count),
+- ``auth``: the ``verify_auth`` dependency,
+- ``serialize``: from the endpoint's return to the finished response object
+  (response validation, ``jsonable_encoder``, JSON rendering); routes must
+  use ``TimedRoute`` (``APIRouter(route_class=TimedRoute)``),
+- ``total``.
+
+Timings are collected in a ``RequestTimings`` held in a context variable, so
+code outside the request (startup, scripts) records nothing.
+
+With ``DB_QUERY_DEBUG`` (development), each request also counts its
+statements by shape (the SQL text with IN-lists collapsed). A shape executed
+``DB_QUERY_REPEAT_THRESHOLD`` times or more is logged as a likely N+1, and
+responses carry ``X-DB-Queries`` and ``X-DB-Max-Repeat`` (highest count of a
+single shape). ``app.query_budget`` is the matching helper for tests.
+"""
+import functools
+import inspect
+import logging
+import re
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Order of the Server-Timing metrics
+_METRICS = ("db", "auth", "serialize")
+
+
+class RequestTimings:
+    """Durations (seconds) and counts accumulated during one request."""
+
+    def __init__(self, request: str | None = None):
+        self.request = request  # "METHOD /path"
+        self.durations: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.endpoint_returned: float | None = None
+        # Statement shape -> executions (DB_QUERY_DEBUG only)
+        self.statements: Counter[str] | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def server_timing(self, total: float) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+        parts = []
+        for name in _METRICS:
+            if name in self.durations:
+                part = f"{name};dur={self.durations[name] * 1000:.1f}"
+                if name == "db":
+                    part += f';desc="{self.counts[name]} queries"'
+                parts.append(part)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    """Timings of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the duration of the block to metric ``name`` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+# --- Database time ---
+
+# Parenthesized placeholder lists: "IN ($1, $2, $3)", "IN (%(id_1_1)s, %(id_1_2)s)"
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\$\d+|%\([^)]*\)s|%s|\?)\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL text with whitespace normalized and placeholder lists collapsed.
+
+    Executions of one query with different parameters share a shape.
+    """
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    timings = _current.get()
+    if timings is not None:
+        timings.add("db", time.perf_counter() - start)
+        if timings.statements is not None:
+            timings.statements[statement_shape(statement)] += 1
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute: drop its start so
+    # it does not stay on the pooled connection
+    pop_start(context, "query_start")
+
+
+def pop_start(context, key: str) -> None:
+    """Discard the start time pushed under ``key`` for a statement that failed."""
+    # No execution context: the error came before the statement was sent (or from a ping)
+    if context.connection is not None and context.execution_context is not None:
+        starts = context.connection.info.get(key)
+        if starts:
+            starts.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Record statement execution time of a (sync) Engine in the request timings."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# --- Serialization time ---
+
+def _mark_returned() -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.endpoint_returned = time.perf_counter()
+
+
+def _mark_return(endpoint):
+    """Wrap an endpoint so the moment it returns is recorded."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _mark_returned()
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            _mark_returned()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records the serialization time of its responses."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_return(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_returned is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_returned)
+            return response
+
+        return timed_handler
+
+
+# --- Middleware ---
+
+class TimingMiddleware:
+    """Time each HTTP request, add ``Server-Timing``, record metrics and log it when done.
+
+    Paths in ``quiet_paths`` get the header but are not logged.
+    """
+
+    def __init__(self, app: ASGIApp, quiet_paths: set[str] = frozenset()):
+        self.app = app
+        self.quiet_paths = quiet_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        timings = RequestTimings(f"{method} {scope['path']}")
+        if settings.DB_QUERY_DEBUG:
+            timings.statements = Counter()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+        metrics.HTTP_REQUESTS_IN_FLIGHT.labels(method).inc()
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+                if timings.statements is not None:
+                    headers.append("X-DB-Queries", str(timings.counts.get("db", 0)))
+                    headers.append("X-DB-Max-Repeat", str(max(timings.statements.values(), default=0)))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - start
+            db_time = timings.durations.get("db", 0.0)
+            db_queries = timings.counts.get("db", 0)
+            metrics.HTTP_REQUESTS_IN_FLIGHT.labels(method).dec()
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            metrics.observe_request(
+                method, route.path if route is not None else "unmatched", status, duration, db_queries, db_time
+            )
+            path = scope["path"]
+            if path not in self.quiet_paths:
+                logger.info(
+                    f"{method} {path} - Status: {status} - Duration: {duration * 1000:.1f}ms "
+                    f"(db {db_time * 1000:.1f}ms / {db_queries} queries)"
+                )
+            if timings.statements:
+                _log_repeated_statements(method, path, timings.statements)
+
+
+def _log_repeated_statements(method: str, path: str, statements: Counter[str]) -> None:
+    for shape, count in statements.most_common():
+        if count < settings.DB_QUERY_REPEAT_THRESHOLD:
+            break
+        logger.warning(f"Possible N+1 in {method} {path}: {count}x {shape[:300]}")
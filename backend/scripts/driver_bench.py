@@ -0,0 +1,141 @@
+"""
+Benchmark of the async engine drivers (``DB_DRIVER``): asyncpg vs psycopg 3.
+
+Sends the requests that dominate API traffic to the application in-process
+(``httpx.ASGITransport``, no network between client and app) with the
+database sessions served by one pooled connection per driver, and reports
+per-request latency:
+
+- ``get``: ``GET /tareas/{tarea_id}``, a primary-key lookup,
+- ``list``: ``GET /estados-tareas/``, a parametric list,
+- ``complete``: ``POST /tareas/{tarea_id}/complete``, the multi-statement
+  flow that ``pipeline.run_statements`` pipelines with psycopg.
+
+The sessions replace ``get_db`` / ``get_read_db`` through
+``app.dependency_overrides`` and are joined to an outer transaction that is
+rolled back after each request, so ``complete`` leaves the data unchanged.
+
+Round-trip latency dominates these small queries, so run it from the API host
+against the real database: on localhost a round trip is a few tens of
+microseconds and asyncpg wins; psycopg only pays off where round trips are
+expensive (see the driver section of the backend architecture).
+
+Usage (from backend/, psycopg needs ``task-manager-backend[psycopg]``)::
+
+    python -m scripts.driver_bench [--iterations 2000] [--driver asyncpg --driver psycopg]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+import httpx
+from sqlalchemy import make_url, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.auth import verify_auth
+from app.config import settings
+from app.database import ASYNC_DATABASE_URL, get_db, get_read_db
+from app.drivers import async_connect_args, async_drivername
+from app.main import app
+from app.models import Tarea
+
+DRIVERS = ("asyncpg", "psycopg")
+
+API = settings.API_PREFIX
+
+OPERATIONS = {
+    "get": lambda client, tarea_id: client.get(f"{API}/tareas/{tarea_id}"),
+    "list": lambda client, tarea_id: client.get(f"{API}/estados-tareas/"),
+    "complete": lambda client, tarea_id: client.post(f"{API}/tareas/{tarea_id}/complete"),
+}
+
+
+def _rolled_back_sessions(engine):
+    """Dependency override: a session whose writes are rolled back after the request."""
+
+    async def session():
+        async with engine.connect() as conn:
+            await conn.begin()
+            # The endpoint's commit leaves the outer transaction open; it is rolled back on exit
+            async with AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="rollback_only") as db:
+                yield db
+            await conn.rollback()
+
+    return session
+
+
+async def bench_driver(driver: str, iterations: int, tarea_ids: list[int]) -> dict[str, list[float]]:
+    """Latencies (seconds) per operation for ``driver``, after a warm-up pass."""
+    engine = create_async_engine(
+        make_url(ASYNC_DATABASE_URL).set(drivername=async_drivername(driver)),
+        pool_size=1,
+        max_overflow=0,
+        connect_args=async_connect_args(driver=driver),
+    )
+    session = _rolled_back_sessions(engine)
+    app.dependency_overrides.update({get_db: session, get_read_db: session, verify_auth: lambda: None})
+    latencies = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for name, operation in OPERATIONS.items():
+                # Warm-up: connection, statement preparation, compilation caches
+                for i in range(min(50, iterations)):
+                    (await operation(client, tarea_ids[i % len(tarea_ids)])).raise_for_status()
+                samples = []
+                for i in range(iterations):
+                    start = time.perf_counter()
+                    response = await operation(client, tarea_ids[i % len(tarea_ids)])
+                    samples.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                latencies[name] = samples
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return latencies
+
+
+def _report(results: dict[str, dict[str, list[float]]]) -> None:
+    print(f"  {'operation':<10} {'driver':<8} {'median ms':>10} {'p95 ms':>8} {'ops/s':>8}")
+    for name in OPERATIONS:
+        for driver, latencies in results.items():
+            samples = sorted(latencies[name])
+            median = statistics.median(samples)
+            p95 = samples[int(len(samples) * 0.95) - 1]
+            print(f"  {name:<10} {driver:<8} {median * 1000:>10.3f} {p95 * 1000:>8.3f} {len(samples) / sum(samples):>8.0f}")
+
+
+async def _run(drivers: list[str], iterations: int) -> int:
+    engine = create_async_engine(ASYNC_DATABASE_URL)
+    async with engine.connect() as conn:
+        tarea_ids = list((await conn.scalars(select(Tarea.tarea_id).order_by(Tarea.tarea_id).limit(100))).all())
+    await engine.dispose()
+    if not tarea_ids:
+        print("No tareas in the database: load some data first")
+        return 1
+
+    results = {}
+    for driver in drivers:
+        print(f"Running {driver} ...")
+        results[driver] = await bench_driver(driver, iterations, tarea_ids)
+    _report(results)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the asyncpg and psycopg drivers on the hot API requests.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed requests per operation and driver")
+    parser.add_argument("--driver", action="append", choices=DRIVERS, help="Driver to run (repeatable; default: both)")
+    args = parser.parse_args()
+
+    # One request log line per iteration would dominate the timings
+    logging.disable(logging.INFO)
+    print(f"Driver benchmark: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}, {args.iterations} iterations, "
+          f"psycopg prepare_threshold={settings.DB_PREPARE_THRESHOLD}")
+    return asyncio.run(_run(args.driver or list(DRIVERS), args.iterations))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
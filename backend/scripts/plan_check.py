@@ -0,0 +1,191 @@
+"""
+Query plan regression check for the hot API queries.
+
+Loads a synthetic dataset into a throwaway schema (copies of ``tareas`` and
+``acciones_realizadas`` with all their indexes), runs EXPLAIN for the
+statements the routers and ``search.py`` issue on every request, and fails if
+any of them falls back to a sequential scan, or to an index walk that discards
+more than ``--max-filtered`` rows (e.g. a primary-key scan filtering on an
+unindexed column). Everything happens inside one transaction that is rolled
+back, so the real tables are never written.
+
+Usage (from backend/)::
+
+    python -m scripts.plan_check [--tareas 100000] [--acciones-por-tarea 5] [--max-filtered 1000]
+
+Exits with status 1 when a plan regresses; intended for CI or before
+shipping schema/query changes.
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection
+
+from app.acciones_batch import acciones_by_tarea_query, tarea_completa_query
+from app.crud import any_id, projection_select
+from app.database import engine
+from app.explain import Explain, parse_plan
+from app.models import AccionRealizada, Tarea
+from app.pagination import encode_cursor, keyset_segments, order_clauses
+from app.schemas import SearchFilter
+from app.search import apply_filter
+
+CHECK_SCHEMA = "plan_check"
+CHECKED_TABLES = {"tareas", "acciones_realizadas"}
+
+_LOAD_SQL = [
+    f"CREATE SCHEMA {CHECK_SCHEMA}",
+    f"CREATE TABLE {CHECK_SCHEMA}.tareas (LIKE public.tareas INCLUDING ALL)",
+    f"CREATE TABLE {CHECK_SCHEMA}.acciones_realizadas (LIKE public.acciones_realizadas INCLUDING ALL)",
+    f"SET LOCAL search_path TO {CHECK_SCHEMA}",
+    # Explicit ids: the copied defaults still point at the public sequences
+    """
+    INSERT INTO tareas (tarea_id, tarea, responsable, tema, estado,
+                        fecha_siguiente_accion, fecha_creacion, fecha_actualizacion)
+    SELECT i,
+           'Tarea ' || i,
+           (ARRAY['Ignacio', 'Mario', 'MJ', 'Elena', 'Carla', 'Álvaro'])[1 + i % 6],
+           'Tema ' || (i % 50),
+           (ARRAY['En curso', 'En curso', 'En curso', 'Completado', 'Cancelado'])[1 + i % 5],
+           CASE WHEN i % 7 = 0 THEN NULL ELSE CURRENT_DATE + (i % 730) - 365 END,
+           NOW() - (i % 1000) * INTERVAL '1 day',
+           NOW() - (i % 100) * INTERVAL '1 hour'
+    FROM generate_series(1, :tareas) AS i
+    """,
+    """
+    INSERT INTO acciones_realizadas (id, tarea_id, accion, fecha_accion, estado)
+    SELECT i,
+           1 + i % :tareas,
+           'Accion ' || i,
+           CURRENT_DATE + (i % 730) - 365,
+           CASE WHEN i % 5 = 0 THEN 'Pendiente' ELSE 'Completada' END
+    FROM generate_series(1, :tareas * :acciones_por_tarea) AS i
+    """,
+    "ANALYZE tareas",
+    "ANALYZE acciones_realizadas",
+]
+
+
+def _pending():
+    return func.lower(AccionRealizada.estado) == "pendiente"
+
+
+def _search(filters: list[SearchFilter], order_by: str | None, order_dir: str = "asc", cursor_row=None, fields=None):
+    """Page query as built by ``search()``: offset 0, or the first keyset
+    segment after ``cursor_row`` (the one that serves a full page)."""
+    query = select(Tarea) if fields is None else projection_select(Tarea, fields, extra=[order_by] if order_by else [])
+    for f in filters:
+        query = apply_filter(query, Tarea, f)
+    query = query.order_by(*order_clauses(Tarea, order_by, order_dir))
+    if cursor_row is not None:
+        cursor = encode_cursor(Tarea, cursor_row, order_by, order_dir)
+        query = query.where(keyset_segments(Tarea, cursor, order_by, order_dir)[0])
+    return query.limit(51)
+
+
+def hot_queries(tareas: int) -> dict:
+    """Named statements mirroring the per-request queries of the API."""
+    today = date.today()
+    tarea_id = tareas // 2
+    page_ids = list(range(tarea_id, tarea_id + 50))
+    cursor_row = Tarea(
+        tarea_id=tarea_id,
+        responsable="Mario",
+        fecha_siguiente_accion=today,
+        fecha_creacion=None,
+    )
+    return {
+        "acciones de una tarea": select(AccionRealizada).where(AccionRealizada.tarea_id == tarea_id),
+        "acciones pendientes de una tarea": select(AccionRealizada).where(
+            AccionRealizada.tarea_id == tarea_id, _pending()
+        ),
+        "acciones no completadas de una tarea": select(AccionRealizada).where(
+            AccionRealizada.tarea_id == tarea_id,
+            ~func.lower(AccionRealizada.estado).in_(["completada", "completado"]),
+        ),
+        "min fecha pendiente (trigger)": select(func.min(AccionRealizada.fecha_accion)).where(
+            AccionRealizada.tarea_id == tarea_id, _pending()
+        ),
+        "acciones by-tareas (50 ids)": acciones_by_tarea_query(page_ids),
+        "acciones pendientes by-tareas (50 ids)": acciones_by_tarea_query(page_ids, estados=["Pendiente"]),
+        "bulk pendientes ANY(:ids)": select(AccionRealizada.id).where(
+            any_id(AccionRealizada.tarea_id, page_ids), _pending()
+        ),
+        "tarea completa": tarea_completa_query(tarea_id),
+        "search próxima semana": _search(
+            [
+                SearchFilter(field="fecha_siguiente_accion", operator="gte", value=today.isoformat()),
+                SearchFilter(field="fecha_siguiente_accion", operator="lte", value=(today + timedelta(days=6)).isoformat()),
+            ],
+            "fecha_siguiente_accion",
+        ),
+        "search orden fecha_siguiente_accion desc": _search([], "fecha_siguiente_accion", "desc"),
+        "search orden fecha_creacion (cursor)": _search([], "fecha_creacion", "asc", cursor_row),
+        "search responsable orden fecha (cursor)": _search(
+            [SearchFilter(field="responsable", operator="eq", value="Mario")],
+            "fecha_siguiente_accion",
+            "asc",
+            cursor_row,
+            fields=["tarea", "responsable"],
+        ),
+        "search orden responsable (cursor)": _search([], "responsable", "asc", cursor_row),
+        "search tarea_id eq": _search([SearchFilter(field="tarea_id", operator="eq", value=tarea_id)], None),
+    }
+
+
+def _bad_scans(plan: dict, max_filtered: int) -> list[str]:
+    """Problems found anywhere in an ``EXPLAIN ANALYZE`` plan tree."""
+    found = []
+    relation = plan.get("Relation Name")
+    if relation in CHECKED_TABLES:
+        filtered = plan.get("Rows Removed by Filter", 0) * plan.get("Actual Loops", 1)
+        if plan["Node Type"] == "Seq Scan":
+            found.append(f"Seq Scan on {relation}")
+        elif filtered > max_filtered:
+            found.append(f"{plan['Node Type']} on {relation} discarded {filtered} rows")
+    for child in plan.get("Plans", []):
+        found.extend(_bad_scans(child, max_filtered))
+    return found
+
+
+def run_checks(conn: Connection, tareas: int, acciones_por_tarea: int, max_filtered: int) -> list[str]:
+    """Load the synthetic data and return the names of the failing queries."""
+    for statement in _LOAD_SQL:
+        conn.execute(text(statement), {"tareas": tareas, "acciones_por_tarea": acciones_por_tarea})
+
+    failures = []
+    for name, statement in hot_queries(tareas).items():
+        plan = parse_plan(conn.scalar(Explain(statement, analyze=True)))
+        problems = _bad_scans(plan, max_filtered)
+        print(f"  {name:<45} {'; '.join(problems) or 'ok'}")
+        if problems:
+            failures.append(name)
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail when a hot API query plans a sequential scan.")
+    parser.add_argument("--tareas", type=int, default=100_000, help="Synthetic tareas to load")
+    parser.add_argument("--acciones-por-tarea", type=int, default=5, help="Synthetic acciones per tarea")
+    parser.add_argument("--max-filtered", type=int, default=1000, help="Rows a scan may discard by filter")
+    args = parser.parse_args()
+
+    print(f"Plan check: {args.tareas} tareas, {args.tareas * args.acciones_por_tarea} acciones")
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            failures = run_checks(conn, args.tareas, args.acciones_por_tarea, args.max_filtered)
+        finally:
+            trans.rollback()
+
+    if failures:
+        print(f"FAILED: {len(failures)} quer{'y' if len(failures) == 1 else 'ies'} without a usable index")
+        return 1
+    print("OK: every hot query is index-driven")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -48,9 +48,17 @@ CREATE TABLE IF NOT EXISTS tareas (
     fecha_actualizacion TIMESTAMP DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_tareas_responsable ON tareas(responsable);
-CREATE INDEX IF NOT EXISTS idx_tareas_tema ON tareas(tema);
-CREATE INDEX IF NOT EXISTS idx_tareas_estado ON tareas(estado);
+-- Filter/sort columns are indexed together with the primary key, matching the
+-- (column, tarea_id) ordering used by search and keyset pagination.
+DROP INDEX IF EXISTS idx_tareas_responsable;
+DROP INDEX IF EXISTS idx_tareas_tema;
+DROP INDEX IF EXISTS idx_tareas_estado;
+CREATE INDEX IF NOT EXISTS idx_tareas_responsable_id ON tareas(responsable, tarea_id);
+CREATE INDEX IF NOT EXISTS idx_tareas_tema_id ON tareas(tema, tarea_id);
+CREATE INDEX IF NOT EXISTS idx_tareas_estado_id ON tareas(estado, tarea_id);
+CREATE INDEX IF NOT EXISTS idx_tareas_fecha_siguiente_accion ON tareas(fecha_siguiente_accion, tarea_id);
+CREATE INDEX IF NOT EXISTS idx_tareas_fecha_creacion ON tareas(fecha_creacion, tarea_id);
+CREATE INDEX IF NOT EXISTS idx_tareas_fecha_actualizacion ON tareas(fecha_actualizacion, tarea_id);
 
 -- Actions performed on tasks
 CREATE TABLE IF NOT EXISTS acciones_realizadas (
@@ -63,10 +71,90 @@ CREATE TABLE IF NOT EXISTS acciones_realizadas (
     fecha_actualizacion TIMESTAMP DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_acciones_tarea_id ON acciones_realizadas(tarea_id);
-CREATE INDEX IF NOT EXISTS idx_acciones_estado ON acciones_realizadas(estado);
+-- Estado is always compared case-insensitively (LOWER(estado)), which a plain
+-- estado index cannot serve. The composite index also covers every tarea_id
+-- lookup (and FK cascades), so the single-column tarea_id index is redundant.
+DROP INDEX IF EXISTS idx_acciones_tarea_id;
+DROP INDEX IF EXISTS idx_acciones_estado;
+CREATE INDEX IF NOT EXISTS idx_acciones_tarea_estado_fecha ON acciones_realizadas(tarea_id, LOWER(estado), fecha_accion);
+CREATE INDEX IF NOT EXISTS idx_acciones_pendientes ON acciones_realizadas(tarea_id, fecha_accion) WHERE LOWER(estado) = 'pendiente';
+CREATE INDEX IF NOT EXISTS idx_acciones_estado_lower ON acciones_realizadas(LOWER(estado));
 CREATE INDEX IF NOT EXISTS idx_acciones_fecha_accion ON acciones_realizadas(fecha_accion);
 
+-- ============================================================================
+-- DENORMALIZED fecha_siguiente_accion
+-- ============================================================================
+-- tareas.fecha_siguiente_accion is the earliest fecha_accion among the tarea's
+-- pending acciones (estado 'pendiente', case-insensitive), or NULL if none.
+-- Statement-level triggers recompute it only for the tareas whose pending
+-- acciones were inserted, deleted or changed, once per statement.
+
+CREATE OR REPLACE FUNCTION recompute_fecha_siguiente_accion(ids INTEGER[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE tareas t
+    SET fecha_siguiente_accion = p.min_fecha,
+        fecha_actualizacion = NOW()
+    FROM (
+        SELECT u.tarea_id,
+               (SELECT MIN(a.fecha_accion)
+                FROM acciones_realizadas a
+                WHERE a.tarea_id = u.tarea_id
+                  AND LOWER(a.estado) = 'pendiente') AS min_fecha
+        FROM (SELECT DISTINCT unnest(ids) AS tarea_id) u
+    ) p
+    WHERE t.tarea_id = p.tarea_id
+      AND t.fecha_siguiente_accion IS DISTINCT FROM p.min_fecha;
+$$;
+
+CREATE OR REPLACE FUNCTION acciones_sync_fecha_siguiente_accion()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM recompute_fecha_siguiente_accion(ARRAY(
+            SELECT tarea_id FROM new_rows WHERE LOWER(estado) = 'pendiente'
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM recompute_fecha_siguiente_accion(ARRAY(
+            SELECT tarea_id FROM old_rows WHERE LOWER(estado) = 'pendiente'
+        ));
+    ELSE
+        -- Only rows that were or became pending and changed a relevant column
+        PERFORM recompute_fecha_siguiente_accion(ARRAY(
+            SELECT x.tarea_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (VALUES (n.tarea_id), (o.tarea_id)) AS x(tarea_id)
+            WHERE (LOWER(n.estado) = 'pendiente' OR LOWER(o.estado) = 'pendiente')
+              AND (n.tarea_id, n.fecha_accion, n.estado)
+                  IS DISTINCT FROM (o.tarea_id, o.fecha_accion, o.estado)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_acciones_fecha_siguiente_ins ON acciones_realizadas;
+CREATE TRIGGER trg_acciones_fecha_siguiente_ins
+    AFTER INSERT ON acciones_realizadas
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION acciones_sync_fecha_siguiente_accion();
+
+DROP TRIGGER IF EXISTS trg_acciones_fecha_siguiente_upd ON acciones_realizadas;
+CREATE TRIGGER trg_acciones_fecha_siguiente_upd
+    AFTER UPDATE ON acciones_realizadas
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION acciones_sync_fecha_siguiente_accion();
+
+DROP TRIGGER IF EXISTS trg_acciones_fecha_siguiente_del ON acciones_realizadas;
+CREATE TRIGGER trg_acciones_fecha_siguiente_del
+    AFTER DELETE ON acciones_realizadas
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION acciones_sync_fecha_siguiente_accion();
+
 -- ============================================================================
 -- SEED DATA
 -- ============================================================================
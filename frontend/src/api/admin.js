@@ -9,10 +9,9 @@ const logger = createLogger('Admin')
 export async function exportDatabase() {
   logger.info('Starting database export')
 
-  const response = await apiClient.get('/admin/export')
-
-  const json = JSON.stringify(response.data, null, 2)
-  const blob = new Blob([json], { type: 'application/json' })
+  // Save the streamed body as-is; parsing it would hold the whole export in memory twice
+  const response = await apiClient.get('/admin/export', { responseType: 'blob' })
+  const blob = response.data
 
   const now = new Date()
   const pad = (n) => String(n).padStart(2, '0')
@@ -13,6 +13,21 @@ function resolveBaseURL() {
 
 export const API_BASE_URL = resolveBaseURL()
 
+/**
+ * Read-your-writes with read replicas: write responses carry this header
+ * (time until which reads must use the primary) and every request echoes
+ * the last value received. The backend decides when it has expired.
+ */
+const READ_PRIMARY_HEADER = 'X-Read-Primary-Until'
+let readPrimaryUntil = null
+
+/**
+ * Headers to add to requests made outside apiClient (e.g. fetch for SSE)
+ */
+export function readPrimaryHeaders() {
+  return readPrimaryUntil ? { [READ_PRIMARY_HEADER]: readPrimaryUntil } : {}
+}
+
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -28,6 +43,10 @@ apiClient.interceptors.request.use(
   async (config) => {
     logger.debug(`${config.method?.toUpperCase()} ${config.url}`)
 
+    if (readPrimaryUntil) {
+      config.headers[READ_PRIMARY_HEADER] = readPrimaryUntil
+    }
+
     // Get Clerk token if available
     // This will be set up when ClerkProvider is available
     if (window.Clerk?.session) {
@@ -55,6 +74,10 @@ apiClient.interceptors.request.use(
 apiClient.interceptors.response.use(
   (response) => {
     logger.debug(`Response ${response.status} from ${response.config.url}`)
+    const until = response.headers[READ_PRIMARY_HEADER.toLowerCase()]
+    if (until) {
+      readPrimaryUntil = until
+    }
     return response
   },
   (error) => {
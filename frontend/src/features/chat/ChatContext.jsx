@@ -1,6 +1,6 @@
 import { createContext, useContext, useState, useCallback, useRef } from 'react'
 import { createLogger } from '@/lib/logger'
-import { API_BASE_URL } from '@/api/client'
+import { API_BASE_URL, readPrimaryHeaders } from '@/api/client'
 
 const logger = createLogger('Chat')
 
@@ -33,7 +33,7 @@ export function ChatProvider({ children }) {
     abortRef.current = abortController
 
     try {
-      const headers = { 'Content-Type': 'application/json' }
+      const headers = { 'Content-Type': 'application/json', ...readPrimaryHeaders() }
       if (window.Clerk?.session) {
         try {
           const token = await window.Clerk.session.getToken()
@@ -93,18 +93,10 @@ export default function DetailPage() {
   const fetchData = async () => {
     setLoading(true)
     try {
-      const [tareaRes, accionesRes] = await Promise.all([
-        apiClient.get(`/tareas/${tarea_id}`),
-        apiClient.get(`/acciones/tarea/${tarea_id}`),
-      ])
-      setTarea(tareaRes.data)
-      // Sort acciones by fecha_accion descending
-      const sorted = [...accionesRes.data].sort((a, b) => {
-        if (!a.fecha_accion) return 1
-        if (!b.fecha_accion) return -1
-        return b.fecha_accion.localeCompare(a.fecha_accion)
-      })
-      setAcciones(sorted)
+      // Tarea + acciones in one request; acciones come sorted by fecha_accion descending
+      const res = await apiClient.get(`/tareas/${tarea_id}/completa`)
+      setTarea(res.data.tarea)
+      setAcciones(res.data.acciones_realizadas)
     } catch (err) {
       LOG.error('Error loading detail', err)
       setError('Error cargando la tarea')
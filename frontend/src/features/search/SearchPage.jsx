@@ -253,6 +253,7 @@ export default function SearchPage() {
         filters: searchFilters,
         limit: pageSize,
         offset: pageOverride * pageSize,
+        include: ['acciones'],
       }
       if (sortField) {
         body.order_by = sortField
@@ -260,6 +261,10 @@ export default function SearchPage() {
       }
 
       const res = await apiClient.post('/tareas/search', body)
+      // Acciones come embedded in each row; seed the cache so expand/export skip per-row fetches
+      for (const row of res.data?.data || []) {
+        if (row.acciones) accionesCache.current.set(row.tarea_id, row.acciones)
+      }
       setResults(res.data)
       setPage(pageOverride)
       // Auto-focus first result after search
@@ -662,25 +667,28 @@ export default function SearchPage() {
     return val || '-'
   }
 
+  // Fill accionesCache for rows not cached yet with a single batch request
+  const loadAccionesFor = async (rows) => {
+    const missing = rows.map(r => r.tarea_id).filter(id => !accionesCache.current.has(id))
+    if (!missing.length) return
+    try {
+      const res = await apiClient.post('/acciones/by-tareas', { tarea_ids: missing })
+      for (const id of missing) {
+        accionesCache.current.set(id, res.data.data[id] || [])
+      }
+    } catch (err) {
+      LOG.error('Error fetching acciones for export', err)
+    }
+  }
+
   // Clipboard export
   const [copying, setCopying] = useState(null)
   const exportToClipboard = async () => {
     if (!filteredData.length) return
     setCopying('loading')
     try {
-      const accionesPromises = filteredData.map(async (row) => {
-        if (accionesCache.current.has(row.tarea_id)) {
-          return { tareaId: row.tarea_id, tarea: row.tarea, acciones: accionesCache.current.get(row.tarea_id) }
-        }
-        try {
-          const res = await apiClient.get(`/acciones/tarea/${row.tarea_id}`)
-          accionesCache.current.set(row.tarea_id, res.data)
-          return { tareaId: row.tarea_id, tarea: row.tarea, acciones: res.data }
-        } catch {
-          return { tareaId: row.tarea_id, tarea: row.tarea, acciones: [] }
-        }
-      })
-      const allAcciones = await Promise.all(accionesPromises)
+      await loadAccionesFor(filteredData)
+      const allAcciones = filteredData.map(row => ({ tarea: row.tarea, acciones: accionesCache.current.get(row.tarea_id) || [] }))
       const lines = allAcciones.map(({ tarea, acciones }) => {
         const pending = acciones.filter(a => a.estado?.toLowerCase() === 'pendiente').map(a => a.accion)
         return pending.length > 0 ? `${tarea}: ${pending.join(' / ')}` : tarea
@@ -704,19 +712,8 @@ export default function SearchPage() {
     setCopying('loading')
     try {
       const selectedRows = filteredData.filter(r => selectedIds.has(r.tarea_id))
-      const accionesPromises = selectedRows.map(async (row) => {
-        if (accionesCache.current.has(row.tarea_id)) {
-          return { tarea: row.tarea, acciones: accionesCache.current.get(row.tarea_id) }
-        }
-        try {
-          const res = await apiClient.get(`/acciones/tarea/${row.tarea_id}`)
-          accionesCache.current.set(row.tarea_id, res.data)
-          return { tarea: row.tarea, acciones: res.data }
-        } catch {
-          return { tarea: row.tarea, acciones: [] }
-        }
-      })
-      const allAcciones = await Promise.all(accionesPromises)
+      await loadAccionesFor(selectedRows)
+      const allAcciones = selectedRows.map(row => ({ tarea: row.tarea, acciones: accionesCache.current.get(row.tarea_id) || [] }))
       const lines = allAcciones.map(({ tarea, acciones }) => {
         const pending = acciones.filter(a => a.estado?.toLowerCase() === 'pendiente').map(a => a.accion)
         return pending.length > 0 ? `${tarea}: ${pending.join(' / ')}` : tarea
@@ -17,6 +17,7 @@ from src.config import settings as config
 from src.config.settings import validate_config, get_app_version, SENSITIVE_PATTERNS
 from src.init import init_schema, recreate_tables
 from src.migrate import TareasMigrationEngine
+from src.restore import RestoreError, restore_export
 
 
 def main():
@@ -39,12 +40,15 @@ Examples:
 
   # Run complete process (recreate + migrate)
   python manage.py complete_process
+
+  # Restore a backend export file (/admin/export) with COPY
+  python manage.py restore --file task_manager_export_2026-01-31_120000.parquet.zip
         """
     )
 
     parser.add_argument(
         'command',
-        choices=['init', 'recreate_tables', 'migrate', 'complete_process'],
+        choices=['init', 'recreate_tables', 'migrate', 'complete_process', 'restore'],
         help='Command to execute'
     )
 
@@ -54,6 +58,11 @@ Examples:
         help=f'Directory containing Excel files (default: {config.EXCEL_SOURCE_DIR})'
     )
 
+    parser.add_argument(
+        '--file',
+        help='Export file to load (restore command)'
+    )
+
     args = parser.parse_args()
 
     # Add separator and session info to log file
@@ -87,7 +96,7 @@ Examples:
     logger.info("=" * 60)
 
     # Validate configuration before executing any command
-    validate_config(args.command, excel_dir=args.excel_dir)
+    validate_config(args.command, excel_dir=args.excel_dir, restore_file=args.file)
 
     try:
         if args.command == 'init':
@@ -143,11 +152,18 @@ Examples:
             logger.info(f"  Database: {config.DB_NAME}@{config.DB_HOST}:{config.DB_PORT}")
             logger.info("=" * 60)
 
+        elif args.command == 'restore':
+            logger.info(f"Starting restore from: {args.file}")
+
+            restore_export(args.file)
+
+            logger.info("Restore completed successfully")
+
     except KeyboardInterrupt:
         logger.warning("Operation cancelled by user (Ctrl+C)")
         sys.exit(1)
-    except (PermissionError, FileNotFoundError) as e:
-        # Handle file access errors gracefully (no traceback)
+    except (PermissionError, FileNotFoundError, RestoreError) as e:
+        # Handle file access and restore input errors gracefully (no traceback)
         logger.error(str(e))
         sys.exit(1)
     except Exception as e:
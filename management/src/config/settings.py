@@ -56,6 +56,16 @@ DATABASE_URL: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{
 # --- Schema path ---
 SCHEMA_PATH: str = str(_project_root / 'db' / 'schema.sql')
 
+# --- Restore (backend export files) ---
+# Tables replaced by the restore command, in dependency order
+RESTORE_TABLES: list[str] = [
+    'estados_tareas',
+    'estados_acciones',
+    'responsables',
+    'tareas',
+    'acciones_realizadas',
+]
+
 # --- Excel Source ---
 EXCEL_SOURCE_DIR: str = os.getenv('EXCEL_SOURCE_DIR', 'excel_source')
 EXCEL_SOURCE_FILE: str = os.getenv('EXCEL_SOURCE_FILE', 'tareas.xlsx')
@@ -66,7 +76,7 @@ EXCEL_TABLE_TAREAS: str = os.getenv('EXCEL_TABLE_TAREAS', 'Tareas')
 BATCH_COMMIT_SIZE: int = int(os.getenv('BATCH_COMMIT_SIZE', '100'))
 
 
-def validate_config(command: str, excel_dir: str = None) -> None:
+def validate_config(command: str, excel_dir: str = None, restore_file: str = None) -> None:
     """
     Validate configuration for a given command.
 
@@ -76,6 +86,7 @@ def validate_config(command: str, excel_dir: str = None) -> None:
     Args:
         command: The CLI command being executed
         excel_dir: Excel source directory (overrides EXCEL_SOURCE_DIR if provided)
+        restore_file: Export file for the restore command
     """
     excel = excel_dir or EXCEL_SOURCE_DIR
     missing = []
@@ -90,6 +101,13 @@ def validate_config(command: str, excel_dir: str = None) -> None:
             if not excel_file.exists():
                 missing.append(f"Excel file not found: {excel_file}")
 
+    # Restore requires the export file
+    if command == 'restore':
+        if not restore_file:
+            missing.append("Export file to restore not given (--file)")
+        elif not Path(restore_file).exists():
+            missing.append(f"Export file not found: {restore_file}")
+
     if missing:
         msg = f"Configuration validation failed for '{command}':\n"
         for item in missing:
@@ -344,6 +344,18 @@ class TareasMigrationEngine:
         fallback_count = 0
         batch_num = 0
 
+        # The acciones triggers stay enabled, so concurrent API writes keep
+        # their tareas in sync, but they would replace the Excel fecha_nba
+        # with the placeholder date of the NBA acciones (and touch
+        # fecha_actualizacion). Keep the imported values aside (a temp table
+        # survives the batch rollbacks once committed) and restore them after.
+        cursor.execute(
+            "CREATE TEMP TABLE migrated_tarea_fechas AS "
+            "SELECT tarea_id, fecha_siguiente_accion, fecha_actualizacion "
+            "FROM tareas WHERE notas_anteriores IS NOT NULL"
+        )
+        self.conn.commit()
+
         for i in range(0, len(all_acciones), batch_size):
             batch = all_acciones[i:i + batch_size]
             batch_num += 1
@@ -372,6 +384,20 @@ class TareasMigrationEngine:
                         LOG.warning(f"Error inserting accion for tarea '{values[0]}': {row_err}")
                         self.conn.rollback()
 
+        # One transaction: the tareas never show the imported date half restored
+        cursor.execute(
+            "UPDATE tareas t "
+            "SET fecha_siguiente_accion = f.fecha_siguiente_accion, fecha_actualizacion = f.fecha_actualizacion "
+            "FROM migrated_tarea_fechas f "
+            "WHERE t.tarea_id = f.tarea_id "
+            "AND (t.fecha_siguiente_accion IS DISTINCT FROM f.fecha_siguiente_accion "
+            "OR t.fecha_actualizacion IS DISTINCT FROM f.fecha_actualizacion)"
+        )
+        restored = cursor.rowcount
+        cursor.execute("DROP TABLE migrated_tarea_fechas")
+        self.conn.commit()
+        LOG.info(f"Restored the Excel fecha_siguiente_accion / fecha_actualizacion of {restored} tareas")
+
         duration = time.time() - start
         rate = inserted / duration if duration > 0 else 0
         LOG.info(
@@ -0,0 +1,3 @@
+"""Restore module."""
+
+from .db_restore import RestoreError, restore_export
@@ -0,0 +1,73 @@
+"""
+Database restore module.
+Loads a backend export file (/admin/export) into PostgreSQL with COPY.
+
+The loader is the backend's own ``backend/app/restore.py`` (the one behind
+``/admin/import``), so both restore paths share one implementation. That
+module only imports the standard library and psycopg2, so it is loaded from
+its file: neither the backend package nor its settings are imported.
+"""
+
+import importlib.util
+import logging
+from pathlib import Path
+
+import psycopg2
+
+from src.config import settings as config
+
+logger = logging.getLogger('task_manager_restore')
+
+COPY_LOADER_PATH = Path(__file__).resolve().parents[3] / 'backend' / 'app' / 'restore.py'
+
+
+def _load_copy_loader():
+    """The backend's restore module, loaded from ``COPY_LOADER_PATH``."""
+    spec = importlib.util.spec_from_file_location('task_manager_copy_loader', COPY_LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_copy_loader = _load_copy_loader()
+RestoreError = _copy_loader.RestoreError
+
+
+def restore_export(file_path: str) -> dict[str, int]:
+    """
+    Replace all tables with the content of an export file.
+
+    The format and compression are taken from the file name as produced by
+    the export (.json, .ndjson, .csv.zip, .parquet.zip, plus .gz/.zst).
+    Runs in a single transaction: on any error the database is unchanged.
+    """
+    logger.info("=== Starting Database Restore ===")
+    logger.info(f"Database: {config.DB_NAME}@{config.DB_HOST}:{config.DB_PORT}")
+
+    path = Path(file_path)
+    fmt, compression = _copy_loader.detect_format(path.name)
+    logger.info(f"Restoring {path} ({fmt}, {compression or 'uncompressed'})")
+    print(f"Restoring {path.name}...")
+
+    conn = psycopg2.connect(
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        dbname=config.DB_NAME,
+    )
+    try:
+        with open(path, 'rb') as f:
+            record_counts = _copy_loader.restore(conn, f, fmt, compression, config.RESTORE_TABLES)
+    except RestoreError as e:
+        logger.error(f"Failed to restore database: {e}")
+        raise
+    finally:
+        conn.close()
+
+    for table, count in record_counts.items():
+        logger.info(f"  - {table} ({count} rows)")
+        print(f"  {table}: {count} rows")
+    logger.info(f"[OK] Database restored: {config.DB_NAME}")
+    print("  [OK] Database restored")
+    return record_counts
@@ -6,6 +6,9 @@ from .config import settings
 
 LOG = logging.getLogger("task_manager_mcp")
 
+# Sent by the backend on writes and echoed back: reads stay on the primary (read-your-writes)
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
 
 class APIError(Exception):
     def __init__(self, message: str, status_code: int = 0):
@@ -19,16 +22,35 @@ class TaskAPIClient:
 
     def __init__(self, base_url: str = None):
         self.base_url = (base_url or settings.API_BASE_URL).rstrip("/")
+        self.read_primary_until = None
         headers = {}
         if settings.API_KEY:
             headers["X-API-Key"] = settings.API_KEY
-        self.client = httpx.Client(base_url=self.base_url, timeout=settings.API_TIMEOUT, headers=headers)
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            timeout=settings.API_TIMEOUT,
+            headers=headers,
+            event_hooks={"request": [self._send_read_primary], "response": [self._keep_read_primary]},
+        )
+
+    def _send_read_primary(self, request: httpx.Request):
+        if self.read_primary_until:
+            request.headers[READ_PRIMARY_HEADER] = self.read_primary_until
+
+    def _keep_read_primary(self, response: httpx.Response):
+        if READ_PRIMARY_HEADER in response.headers:
+            self.read_primary_until = response.headers[READ_PRIMARY_HEADER]
 
     def search(self, table: str, body: dict) -> dict:
         """POST /{table}/search."""
         response = self.client.post(f"/{table}/search", json=body)
         return self._handle(response)
 
+    def post(self, path: str, body: dict) -> list | dict:
+        """POST /{path}."""
+        response = self.client.post(f"/{path}", json=body)
+        return self._handle(response)
+
     def get_record(self, table: str, record_id: str) -> dict:
         """GET /{table}/{id}."""
         response = self.client.get(f"/{table}/{record_id}")
@@ -9,6 +9,12 @@ TABLA_DESCRIPCIONES = {
 
 TABLAS_CON_BUSQUEDA = {"tareas"}
 
+# Default column projection for buscar_tareas (omits the large notas_anteriores text)
+CAMPOS_BUSQUEDA_TAREAS = [
+    "tarea_id", "tarea", "responsable", "descripcion",
+    "fecha_siguiente_accion", "tema", "estado",
+]
+
 
 def get_url_prefix(table_name: str) -> str:
     overrides = {
@@ -2,6 +2,7 @@
 
 import logging
 from ..config import settings
+from ..table_metadata import CAMPOS_BUSQUEDA_TAREAS
 
 LOG = logging.getLogger("task_manager_mcp")
 
@@ -14,8 +15,12 @@ def register(mcp, api_client):
         orden_direccion: str = "asc",
         limite: int = 50,
         desplazamiento: int = 0,
+        campos: list[str] | None = None,
     ) -> dict:
-        """Busca tareas con filtros flexibles. Cada filtro tiene field, operator y value."""
+        """Busca tareas con filtros flexibles. Cada filtro tiene field, operator y value.
+
+        campos limita las columnas devueltas (por defecto todas salvo notas_anteriores).
+        """
         limit = min(limite, settings.MAX_QUERY_ROWS)
         filters = []
         for f in (filtros or []):
@@ -27,6 +32,8 @@ def register(mcp, api_client):
             "order_dir": orden_direccion,
             "limit": limit,
             "offset": desplazamiento,
+            "count_mode": "window",
+            "fields": campos or CAMPOS_BUSQUEDA_TAREAS,
         }
         return api_client.search("tareas", body)
 
@@ -34,3 +41,23 @@ def register(mcp, api_client):
     def buscar_acciones(tarea_id: int) -> list:
         """Obtiene todas las acciones realizadas de una tarea especifica."""
         return api_client.list_records(f"acciones/tarea/{tarea_id}")
+
+    @mcp.tool()
+    def buscar_acciones_por_tareas(
+        tarea_ids: list[int],
+        estados: list[str] | None = None,
+        fecha_desde: str | None = None,
+        fecha_hasta: str | None = None,
+    ) -> dict:
+        """Obtiene las acciones de varias tareas en una sola llamada, agrupadas por tarea_id.
+
+        estados filtra por estado (sin distinguir mayusculas); fecha_desde/fecha_hasta
+        (YYYY-MM-DD) acotan fecha_accion.
+        """
+        body = {
+            "tarea_ids": tarea_ids,
+            "estados": estados,
+            "fecha_desde": fecha_desde,
+            "fecha_hasta": fecha_hasta,
+        }
+        return api_client.post("acciones/by-tareas", body)
@@ -9,9 +9,4 @@ def register(mcp, api_client):
     @mcp.tool()
     def obtener_tarea(tarea_id: int) -> dict:
         """Obtiene los datos completos de una tarea y sus acciones realizadas."""
-        tarea = api_client.get_record("tareas", tarea_id)
-        acciones = api_client.list_records(f"acciones/tarea/{tarea_id}")
-        return {
-            "tarea": tarea,
-            "acciones_realizadas": acciones,
-        }
+        return api_client.get_record("tareas", f"{tarea_id}/completa")